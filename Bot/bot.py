@@ -1,14 +1,29 @@
+import logging
 import time
 from Sensors.sensors import SENSORS
-import requests
+from Sensors.streams import stream_key, seek, used
+from Bot.session import HttpSession
+from Bot.url_encoder import UrlEncoder
+from Bot.retry import RetryPolicy, PendingSend, DeadLetterStore
+from Bot.rate_limit import RateLimiter
+from Bot.schedule import SchedulePolicy
+from Bot_farm.clock import Clock
+from Sinks.sinks import Sink, HttpSink, SendError, THINGSPEAK_URL, THROTTLED, SERVER_ERROR, FINAL_RESULTS
+from collections import deque
+
+
+logger = logging.getLogger(__name__)
 
 
 def check_sensor_config(sensor_config):
-    assert isinstance(sensor_config, dict), f"Incorrect sensor_config. Must be dict, but now: {type(sensor_config)}"
+    if not isinstance(sensor_config, dict):
+        raise Exception(f"Incorrect sensor_config. Must be dict, but now: {type(sensor_config)}")
     keys = list(sensor_config.keys())
-    assert len(keys) == 1, f"Incorrect sensor_config. Only 1 key expected, but got: {keys}"
+    if len(keys) != 1:
+        raise Exception(f"Incorrect sensor_config. Only 1 key expected, but got: {keys}")
     key = keys[0]
-    assert key in SENSORS, f"Incorrect sensor_config. Unknown sensor: {key}"
+    if key not in SENSORS:
+        raise Exception(f"Incorrect sensor_config. Unknown sensor: {key}")
 
 
 class Bot:
@@ -21,29 +36,74 @@ class Bot:
     sensor1_conf: {...}
         Every sensor config contain all information about current sensor behaviour: min, max value,
         growth trend and etc.
+
+    session: HttpSession shared by all bots of a farm. If None - the bot creates its own session.
+
+    retry_policy, dead_letters: shared by all bots of a farm. Failed sends wait in the retry queue of
+        the bot and are tried again according to retry_policy. Sends failed max_attempts times go to
+        dead_letters. While failed sends wait, the farm serves other bots. A send throttled by the server
+        waits as long as the server asked, sends rejected for auth or client errors go to dead_letters at once.
+
+    sink: where measured values are sent. If None - values are sent to thingspeak server through session.
+
+    clock: clock of the farm. If None - wall clock.
+
+    metrics: FarmMetrics of the farm. If None - send latency, retries and measure cost are not recorded.
+
+    schedule_policy: SchedulePolicy of the farm, when the next measurement is planned. If None - update_time
+        after the previous one.
+
+    seed: seed of the farm. Every sensor draws random numbers from its own stream with key of
+        (seed, bot_name, field), so the bot gives the same values in any farm, shard or engine with the same seed.
+        If None - random streams.
+
+    rate_limiter: RateLimiter of the farm, shared by all bots. A measurement or retry waits until limits of
+        the channel and the account of the bot allow one more send. If None - sends are not limited.
+
+    Values of sensors can be replayed from precomputed trajectories instead of measuring, see replay().
     """
 
-    def __init__(self, bot_config: dict) -> None:
+    def __init__(self, bot_config: dict, session: HttpSession = None, retry_policy: RetryPolicy = None,
+                 dead_letters: DeadLetterStore = None, sink: Sink = None, clock: Clock = None, metrics=None,
+                 schedule_policy: SchedulePolicy = None, seed=None, rate_limiter: RateLimiter = None) -> None:
         self.bot_config = bot_config
+        self.seed = seed
+        self.rate_limiter = rate_limiter
+        self.session = session if session is not None else HttpSession()
+        self.sink = sink if sink is not None else HttpSink(self.session)
+        self.clock = clock if clock is not None else Clock()
+        self.metrics = metrics
+        self.schedule_policy = schedule_policy if schedule_policy is not None else SchedulePolicy()
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.dead_letters = dead_letters if dead_letters is not None else DeadLetterStore()
+        self.retry_queue = deque()
+        self.sent_count = 0  # Delivered sends
+        self.failed_count = 0  # Failed attempts
+        self.throttled_count = 0  # Attempts throttled by server
         self._check_bot_config()
         self.email = self.bot_config['email']  # email of account were current bot was created
         self.channel = self.bot_config['channel']  # num of channel in account
         self.bot_name = self.bot_config['bot_name']
         self.api_key = self.bot_config['api_key']  # api_key of account
         self.update_time = self._update_time  # Time between measurements
-        self.start_time = time.time()
-        self.next_send_time = 0
+        self.start_time = self.clock.time()
+        self.scheduled_time = self.schedule_policy.first_time(self.start_time, self.update_time)  # Without jitter
+        self.next_measure_time = self.scheduled_time
+        self.next_send_time = self.next_measure_time  # Time of the next measurement or retry, whichever comes first
         self.sensors_configs = self.bot_config['sensors']
         self.sensors = []
         self.sensors_initialization()
+        self.url_encoder = UrlEncoder(self.api_key, self.sensors)
+        self.trajectory = None  # Precomputed values (steps, sensors) replayed instead of measures
+        self.step = 0  # Row of trajectory with the next values
         # print('Bot: ' + self.email + ' ' + self.channel + ' ' + self.api_key)
 
     def _check_bot_config(self) -> None:
         """Check if config file was created correct"""
 
         mandatory_keys = ['email', 'channel', 'bot_name', 'api_key', 'sensors']
-        assert isinstance(self.bot_config, dict), f"Incorrect bot_config. It must be dict, " \
-                                                  f"but now {type(self.bot_config)}"
+        if not isinstance(self.bot_config, dict):
+            raise Exception(f"Incorrect bot_config. It must be dict, but now {type(self.bot_config)}")
         for key in mandatory_keys:
             if key not in self.bot_config.keys():
                 raise Exception(f"Incorrect bot_config. Key {key} is mandatory for all bots but absent.")
@@ -55,45 +115,242 @@ class Bot:
 
     def sensors_initialization(self) -> None:
         """Initialization of all sensors (1-8) for the bot"""
-        assert isinstance(self.sensors_configs, list), f"Incorrect bot_config. bot_config['sensor'] must be" \
-                                                       f"list, but now it's {type(self.sensors_configs)}"
+        if not isinstance(self.sensors_configs, list):
+            raise Exception(f"Incorrect bot_config. bot_config['sensors'] must be list, "
+                            f"but now it's {type(self.sensors_configs)}")
 
         for sensor_config in self.sensors_configs:
             check_sensor_config(sensor_config)
 
             sensor_name = list(sensor_config.keys())[0]
             sensor = SENSORS[sensor_name]
-            self.sensors.append(sensor(sensor_config[sensor_name]))
+            self.sensors.append(sensor(sensor_config[sensor_name], self._stream_key(sensor_config[sensor_name])))
 
-    def measure_all_sensors(self) -> None:
-        """Measure values for all sensors"""
-        for sensor in self.sensors:
-            sensor.measure()
-            print(f"{sensor.sensor_name}: {sensor.current_value}")
+    def _stream_key(self, sensor_config: dict):
+        if self.seed is None or not isinstance(sensor_config, dict) or 'field' not in sensor_config.keys():
+            return None  # Sensor checks its config itself
+        return stream_key(self.seed, self.bot_name, sensor_config['field'])
 
-    def send_all_values(self) -> None:
-        """Send last measured values to server"""
-        values = ''
+    def update_config(self, bot_config: dict, sink: Sink = None) -> None:
+        """Apply changed bot_config while the bot is running. A sensor of the same type on the same place
+        keeps its value and tend, other sensors are created again"""
+        self.bot_config = bot_config
+        self._check_bot_config()
+        self.email = self.bot_config['email']
+        self.channel = self.bot_config['channel']
+        self.api_key = self.bot_config['api_key']
+        self.update_time = self._update_time
+        if sink is not None:
+            self.sink = sink
+        old_sensors = self.sensors
+        self.stop_replay()  # Trajectory is computed for the old config
+        self.sensors_configs = self.bot_config['sensors']
+        self.sensors = []
+        self.sensors_initialization()
         for num, sensor in enumerate(self.sensors):
-            values += f'&field{num+1}={sensor.current_value}'
-        url = f'https://api.thingspeak.com/update?api_key={self.api_key}{values}'
-        while True:
-            attemp = 0
-            time.sleep(attemp)
-            attemp += 1
-            try:
-                requests.get(url)
-            except Exception:
-                print(f'Failed request, try again.')
+            if num < len(old_sensors) and type(old_sensors[num]) is type(sensor):
+                old_sensors[num].update_config(sensor.sensor_config)
+                self.sensors[num] = old_sensors[num]
+        self.url_encoder = UrlEncoder(self.api_key, self.sensors)
+
+    def set_phase(self, phase_time: float) -> None:
+        """Move the first measurement by phase_time seconds inside update_time"""
+        self.scheduled_time = self.schedule_policy.first_time(self.start_time, self.update_time, phase_time)
+        self.next_measure_time = self.scheduled_time + self.schedule_policy.jitter_time()
+        self._update_next_send_time()
+
+    def plan_next_measurement(self, now: float) -> None:
+        """Plan the next measurement after the one started at now"""
+        self.scheduled_time = self.schedule_policy.next_time(self.scheduled_time, now, self.update_time)
+        self.next_measure_time = self.scheduled_time + self.schedule_policy.jitter_time()
+
+    def replay(self, trajectory) -> None:
+        """Take values of sensors from rows of trajectory (steps, sensors) instead of measuring. Replay starts
+        from the row of the number of measures done by the sensors, e.g. after restore from checkpoint.
+        After the last row sensors continue to measure from the last values"""
+        self.trajectory = trajectory
+        self.step = used(self.sensors[0]) if self.sensors else 0
+
+    def stop_replay(self) -> None:
+        """Measure sensors again. Their random streams continue after the replayed measures"""
+        if self.trajectory is None:
+            return
+        for sensor in self.sensors:
+            seek(sensor, self.step)
+        self.trajectory = None
+
+    def measure_all_sensors(self) -> None:
+        """Measure values for all sensors or take them from the trajectory"""
+        if self.trajectory is not None and self.step == len(self.trajectory):
+            self.stop_replay()
+        if self.trajectory is not None:
+            for sensor, value in zip(self.sensors, self.trajectory[self.step].tolist()):
+                sensor.current_value = value
+            self.step += 1
+        else:
+            if self.metrics is not None:
+                for sensor in self.sensors:
+                    measure_start = time.perf_counter()
+                    sensor.measure()
+                    self.metrics.measure_cost.observe(time.perf_counter() - measure_start, sensor.sensor_name)
             else:
-                break
-        self.next_send_time = time.time() + self.update_time
-        print(f"{self.bot_name} - update all values")
-        print(time.asctime())
-        print('____________________________________________________________')
+                for sensor in self.sensors:
+                    sensor.measure()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('measure', extra={'fields': {'bot_name': self.bot_name, 'values': {
+                sensor.sensor_name: sensor.current_value for sensor in self.sensors}}})
+
+    def values(self) -> tuple:
+        """Last measured values of all sensors"""
+        return tuple(sensor.current_value for sensor in self.sensors)
+
+    def update_url(self, values: tuple, base_url: str = THINGSPEAK_URL) -> str:
+        """Return url to send values to server. Values are sent to fields of sensors configs"""
+        return self.url_encoder.url(values, base_url)
+
+    def try_send(self, pending: PendingSend) -> bool:
+        """Make one attempt to send values. Return True if values were delivered"""
+        pending.attempts += 1
+        send_start = time.perf_counter()
+        try:
+            self.sink.send(self, pending)
+        except Exception as e:
+            self.record_failure(pending, e)
+            if self.metrics is not None:
+                self.metrics.send_latency.observe(time.perf_counter() - send_start)
+            return False
+        if not self.sink.delivers_later:
+            self.record_sent()
+        if self.metrics is not None:
+            self.metrics.send_latency.observe(time.perf_counter() - send_start)
+        return True
+
+    def record_sent(self) -> None:
+        """Count delivered send"""
+        self.sent_count += 1
+        if self.metrics is not None:
+            self.metrics.sends.inc()
+
+    def record_failure(self, pending: PendingSend, error: Exception) -> None:
+        """Count failed attempt, keep class of the response and delay asked by server in pending.
+        Errors without response (connection, timeout) are server errors"""
+        pending.error = repr(error)
+        if isinstance(error, SendError):
+            pending.result = error.result
+            pending.retry_after = error.retry_after
+        else:
+            pending.result = SERVER_ERROR
+            pending.retry_after = None
+        self.record_failed(pending.result)
+
+    def record_failed(self, result: str) -> None:
+        """Count failed attempt with class result of the response"""
+        self.failed_count += 1
+        if result == THROTTLED:
+            self.throttled_count += 1
+        if self.metrics is not None:
+            self.metrics.failures.inc()
+            if result == THROTTLED:
+                self.metrics.throttled.inc()
+            elif result in FINAL_RESULTS:
+                self.metrics.rejected.inc()
 
-    def start(self) -> None:
-        """Measure and send all values"""
+    def retry_delay(self, pending: PendingSend, now: float):
+        """Seconds before the next try of failed send, None if it goes to dead letters.
+        Delay asked by server is used instead of backoff. After a throttled send the rate limit of the
+        channel waits for the same delay, so the next measurements are not throttled too"""
+        if pending.result in FINAL_RESULTS or self.retry_policy.exhausted(pending.attempts):
+            return None
+        if pending.retry_after is None:
+            return self.retry_policy.delay(pending.attempts)
+        if pending.result == THROTTLED and self.rate_limiter is not None:
+            self.rate_limiter.throttle(self.email, self.channel, now, pending.retry_after)
+        return pending.retry_after
 
-        self.measure_all_sensors()
-        self.send_all_values()
+    def _failed(self, pending: PendingSend, now: float) -> None:
+        """Put failed send to the retry queue or to dead letters if it is not retried"""
+        delay = self.retry_delay(pending, now)
+        if delay is None:
+            logger.error('failed request, values moved to dead letters', extra={'fields': {
+                'bot_name': self.bot_name, 'attempts': pending.attempts, 'result': pending.result,
+                'error': pending.error}})
+            self.dead_letters.add(self.bot_name, pending, now)
+            return
+        pending.next_try_time = now + delay
+        logger.warning('failed request, try again', extra={'fields': {
+            'bot_name': self.bot_name, 'attempts': pending.attempts, 'next_try_time': pending.next_try_time,
+            'result': pending.result, 'error': pending.error}})
+        self.retry_queue.append(pending)
+
+    def send_all_values(self) -> None:
+        """Send last measured values to server. Failed send is queued for retry"""
+        now = self.clock.time()
+        pending = PendingSend(self.values(), now)
+        self.plan_next_measurement(now)
+        if not self.try_send(pending):
+            self._failed(pending, now)
+            return
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('update all values', extra={'fields': {'bot_name': self.bot_name, 'send_time': now}})
+
+    def retry_failed(self) -> None:
+        """Try again the oldest failed send"""
+        pending = self.retry_queue.popleft()
+        now = self.clock.time()
+        if self.metrics is not None:
+            self.metrics.retries.inc()
+        if not self.try_send(pending):
+            self._failed(pending, now)
+            return
+        logger.info('delivered values after retry', extra={'fields': {
+            'bot_name': self.bot_name, 'attempts': pending.attempts}})
+        if self.retry_queue:
+            self.retry_queue[0].next_try_time = now
+
+    def send_stats(self, now: float) -> dict:
+        """Attempted and accepted sends since the bot was created, effective and attempted sends per second"""
+        elapsed = now - self.start_time
+        attempted = self.sent_count + self.failed_count
+        return {
+            'attempted': attempted,
+            'accepted': self.sent_count,
+            'throttled': self.throttled_count,
+            'attempted_per_second': round(attempted / elapsed, 3) if elapsed > 0 else 0.0,
+            'effective_per_second': round(self.sent_count / elapsed, 3) if elapsed > 0 else 0.0
+        }
+
+    def _update_next_send_time(self) -> None:
+        self.next_send_time = self.next_measure_time
+        if self.retry_queue:
+            self.next_send_time = min(self.next_send_time, self.retry_queue[0].next_try_time)
+
+    def rate_limit_wait(self, now: float) -> float:
+        """Take a send from rate limits of the channel and the account of the bot and return 0,
+        or return seconds to wait for them"""
+        return self.rate_limiter.acquire(self.email, self.channel, now) if self.rate_limiter is not None else 0
+
+    def start(self) -> bool:
+        """Retry failed send if it is time, measure and send all values if it is time.
+        A send not allowed by rate limits is moved to the time they allow it. Return True if values were measured"""
+
+        now = self.clock.time()
+        measured = False
+        if self.retry_queue and self.retry_queue[0].next_try_time <= now:
+            wait_time = self.rate_limit_wait(now)
+            if wait_time:
+                self.retry_queue[0].next_try_time = now + wait_time
+            else:
+                self.retry_failed()
+        if self.next_measure_time <= now:
+            if self.schedule_policy.skips(self.next_measure_time, now):
+                self.plan_next_measurement(now)
+            else:
+                wait_time = self.rate_limit_wait(now)
+                if wait_time:
+                    self.next_measure_time = now + wait_time
+                else:
+                    self.measure_all_sensors()
+                    self.send_all_values()
+                    measured = True
+        self._update_next_send_time()
+        return measured
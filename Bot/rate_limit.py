@@ -0,0 +1,106 @@
+class TokenBucket:
+    """Bucket of up to burst tokens, refilled with one token every interval seconds. Starts full"""
+
+    __slots__ = ('interval', 'burst', 'tokens', 'time')
+
+    def __init__(self, interval: float, burst: int, now: float) -> None:
+        self.interval = interval
+        self.burst = burst
+        self.tokens = burst
+        self.time = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until the bucket has a token, 0 if it has one now"""
+        if now > self.time:
+            self.tokens = min(self.burst, self.tokens + (now - self.time) / self.interval)
+            self.time = now
+        if self.tokens >= 1 - 1e-9:  # Refill after exactly the returned wait can be short by rounding error
+            return 0
+        return (1 - self.tokens) * self.interval
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+
+class RateLimiter:
+    """Limits of update API: one token bucket per channel and one per account (email of bot).
+    Channels are numbered inside an account, so a channel is (email, channel).
+
+    A send takes a token from the bucket of its channel and from the bucket of its account. If one of them
+    is empty the send waits until both have a token, so bots never send faster than the server accepts.
+
+    channel_interval: min seconds between sends of a channel (thingspeak rejects updates of a channel more
+        often than every 15 seconds)
+    channel_burst: sends of a channel allowed at once after a pause
+    account_interval: min seconds between sends of all channels of an account on average. 0 - not limited
+    account_burst: sends of an account allowed at once after a pause
+    """
+
+    def __init__(self, channel_interval: float = 15, channel_burst: int = 1, account_interval: float = 0,
+                 account_burst: int = 1) -> None:
+        if channel_interval < 0:
+            raise ValueError(f"Incorrect rate_limit config. channel_interval must be >= 0, but now: {channel_interval}")
+        if account_interval < 0:
+            raise ValueError(f"Incorrect rate_limit config. account_interval must be >= 0, but now: {account_interval}")
+        if channel_burst < 1:
+            raise ValueError(f"Incorrect rate_limit config. channel_burst must be >= 1, but now: {channel_burst}")
+        if account_burst < 1:
+            raise ValueError(f"Incorrect rate_limit config. account_burst must be >= 1, but now: {account_burst}")
+        self.channel_interval = channel_interval
+        self.channel_burst = channel_burst
+        self.account_interval = account_interval
+        self.account_burst = account_burst
+        self.channels = {}  # (email, channel) -> TokenBucket
+        self.accounts = {}  # email -> TokenBucket
+        self.delayed = 0  # Sends which waited for a token
+
+    @classmethod
+    def from_config(cls, rate_limit_config: dict) -> 'RateLimiter':
+        """Create limiter from 'rate_limit' part of bot_farm_config"""
+        if not isinstance(rate_limit_config, dict):
+            raise TypeError(f"Incorrect rate_limit config. Must be dict, but now: {type(rate_limit_config)}")
+        return cls(
+            channel_interval=float(rate_limit_config['channel_interval'])
+            if 'channel_interval' in rate_limit_config.keys() else 15,
+            channel_burst=int(rate_limit_config['channel_burst']) if 'channel_burst' in rate_limit_config.keys() else 1,
+            account_interval=float(rate_limit_config['account_interval'])
+            if 'account_interval' in rate_limit_config.keys() else 0,
+            account_burst=int(rate_limit_config['account_burst']) if 'account_burst' in rate_limit_config.keys() else 1
+        )
+
+    def _channel_bucket(self, email, channel, now: float) -> TokenBucket:
+        key = (email, channel)
+        if key not in self.channels:
+            self.channels[key] = TokenBucket(self.channel_interval, self.channel_burst, now)
+        return self.channels[key]
+
+    def _buckets(self, email, channel, now: float) -> list:
+        buckets = []
+        if self.channel_interval:
+            buckets.append(self._channel_bucket(email, channel, now))
+        if self.account_interval:
+            if email not in self.accounts:
+                self.accounts[email] = TokenBucket(self.account_interval, self.account_burst, now)
+            buckets.append(self.accounts[email])
+        return buckets
+
+    def throttle(self, email, channel, now: float, delay: float) -> None:
+        """Server throttled a send of channel of account email and asked to wait delay seconds:
+        the next send of the channel waits"""
+        if not self.channel_interval:
+            return
+        bucket = self._channel_bucket(email, channel, now)
+        bucket.wait_time(now)
+        bucket.tokens = min(bucket.tokens, 1 - delay / bucket.interval)
+
+    def acquire(self, email, channel, now: float) -> float:
+        """Take a token for one send of channel of account email and return 0.
+        If there are no tokens - take nothing and return seconds to wait"""
+        buckets = self._buckets(email, channel, now)
+        wait_time = max([bucket.wait_time(now) for bucket in buckets], default=0)
+        if wait_time > 0:
+            self.delayed += 1
+            return wait_time
+        for bucket in buckets:
+            bucket.take()
+        return 0
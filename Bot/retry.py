@@ -0,0 +1,84 @@
+import json
+import random
+
+
+class RetryPolicy:
+    """Bounded exponential backoff with full jitter.
+
+    max_attempts: number of attempts before a send goes to dead letter store
+    base_delay: delay before the first retry in seconds, doubled for every next retry
+    max_delay: upper limit for delay between retries in seconds
+    rng: random.Random for jitter of delays. If None - own unseeded generator
+    """
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 1, max_delay: float = 300,
+                 rng: random.Random = None) -> None:
+        if max_attempts < 1:
+            raise ValueError(f"Incorrect retry config. max_attempts must be >= 1, but now: {max_attempts}")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng if rng is not None else random.Random()
+
+    @classmethod
+    def from_config(cls, retry_config: dict, rng: random.Random = None) -> 'RetryPolicy':
+        """Create policy from 'retry' part of bot_farm_config"""
+        if not isinstance(retry_config, dict):
+            raise TypeError(f"Incorrect retry config. Must be dict, but now: {type(retry_config)}")
+        return cls(
+            max_attempts=int(retry_config['max_attempts']) if 'max_attempts' in retry_config.keys() else 5,
+            base_delay=float(retry_config['base_delay']) if 'base_delay' in retry_config.keys() else 1,
+            max_delay=float(retry_config['max_delay']) if 'max_delay' in retry_config.keys() else 300,
+            rng=rng
+        )
+
+    def delay(self, attempt: int) -> float:
+        """Delay before the next try after 'attempt' failed attempts"""
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def exhausted(self, attempt: int) -> bool:
+        return attempt >= self.max_attempts
+
+
+class PendingSend:
+    """Values of one measurement waiting for the next try"""
+
+    def __init__(self, values: tuple, created_time: float) -> None:
+        self.values = values
+        self.created_time = created_time
+        self.attempts = 0
+        self.next_try_time = created_time
+        self.error = ''
+        self.result = ''  # Class of the last failed attempt, see Sinks.sinks
+        self.retry_after = None  # Delay before the next try asked by server
+
+
+class DeadLetterStore:
+    """Store for values which could not be delivered after all attempts.
+
+    If file_name is given - every dead letter is appended to the file as a json line,
+    otherwise dead letters are kept in memory.
+    """
+
+    def __init__(self, file_name: str = None) -> None:
+        self.file_name = file_name
+        self.letters = []
+        self.count = 0
+
+    def add(self, bot_name: str, pending: PendingSend, now: float) -> None:
+        """Store values of pending which were given up at time now of the farm clock"""
+        letter = {
+            'bot_name': bot_name,
+            'created_time': pending.created_time,
+            'dead_time': now,
+            'attempts': pending.attempts,
+            'values': list(pending.values),
+            'result': pending.result,
+            'error': pending.error
+        }
+        self.count += 1
+        if self.file_name is None:
+            self.letters.append(letter)
+            return
+        with open(self.file_name, 'a') as f:
+            f.write(json.dumps(letter) + '\n')
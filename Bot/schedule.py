@@ -0,0 +1,113 @@
+import math
+import random
+
+
+MODES = ('relative', 'fixed')
+CATCH_UP_POLICIES = ('skip', 'coalesce', 'burst')
+PHASES = ('none', 'even', 'random')
+
+
+class SchedulePolicy:
+    """When a bot measures and sends next time.
+
+    mode="relative" - the next send is update_time after the current one started, delays add up
+    mode="fixed" - sends are planned on fixed ticks origin + k * update_time, delays do not drift the schedule
+
+    catch_up: what a bot does with ticks missed while the farm was behind (only for "fixed" mode)
+        "skip" - a bot later than max_lag seconds does not send and waits for the next tick in the future
+        "coalesce" - one send right away for all missed ticks, then the next tick in the future
+        "burst" - send every missed tick, sends later than max_lag seconds are limited to burst_rate
+            sends per second for the whole farm
+
+    phase: offset of the first measurement of every bot inside its update_time, so bots with equal
+        update_time do not send at the same moment
+        "none" - all bots start at once
+        "even" - offsets of bots are spread evenly over update_time
+        "random" - random offset for every bot
+    jitter: every send is moved by random offset from -jitter to +jitter seconds. In "fixed" mode the
+        offset does not move the next ticks
+    rng: random.Random for random phases and jitter. If None - own unseeded generator
+    """
+
+    def __init__(self, mode: str = 'relative', catch_up: str = 'skip', burst_rate: float = 10,
+                 max_lag: float = 1, phase: str = 'none', jitter: float = 0, phase_shift: float = 0,
+                 origin: float = 0, rng: random.Random = None) -> None:
+        if mode not in MODES:
+            raise ValueError(f"Incorrect schedule config. Unknown mode: {mode}. Avaliable: {list(MODES)}")
+        if catch_up not in CATCH_UP_POLICIES:
+            raise ValueError(f"Incorrect schedule config. Unknown catch_up: {catch_up}. "
+                             f"Avaliable: {list(CATCH_UP_POLICIES)}")
+        if burst_rate <= 0:
+            raise ValueError(f"Incorrect schedule config. burst_rate must be > 0, but now: {burst_rate}")
+        if phase not in PHASES:
+            raise ValueError(f"Incorrect schedule config. Unknown phase: {phase}. Avaliable: {list(PHASES)}")
+        if jitter < 0:
+            raise ValueError(f"Incorrect schedule config. jitter must be >= 0, but now: {jitter}")
+        self.mode = mode
+        self.catch_up = catch_up
+        self.burst_rate = burst_rate
+        self.max_lag = max_lag
+        self.phase = phase
+        self.jitter = jitter
+        self.phase_shift = phase_shift  # Part of one step of "even" phase, shards of a farm are shifted by it
+        self.origin = origin
+        self.rng = rng if rng is not None else random.Random()
+        self._next_catch_up_time = 0
+
+    @classmethod
+    def from_config(cls, schedule_config: dict, origin: float, rng: random.Random = None) -> 'SchedulePolicy':
+        """Create policy from 'schedule' part of bot_farm_config. Fixed ticks are counted from origin"""
+        if not isinstance(schedule_config, dict):
+            raise TypeError(f"Incorrect schedule config. Must be dict, but now: {type(schedule_config)}")
+        return cls(
+            mode=schedule_config['mode'] if 'mode' in schedule_config.keys() else 'relative',
+            catch_up=schedule_config['catch_up'] if 'catch_up' in schedule_config.keys() else 'skip',
+            burst_rate=float(schedule_config['burst_rate']) if 'burst_rate' in schedule_config.keys() else 10,
+            max_lag=float(schedule_config['max_lag']) if 'max_lag' in schedule_config.keys() else 1,
+            phase=schedule_config['phase'] if 'phase' in schedule_config.keys() else 'none',
+            jitter=float(schedule_config['jitter']) if 'jitter' in schedule_config.keys() else 0,
+            phase_shift=float(schedule_config['phase_shift']) if 'phase_shift' in schedule_config.keys() else 0,
+            origin=origin,
+            rng=rng
+        )
+
+    @property
+    def rate_limited(self) -> bool:
+        return self.mode == 'fixed' and self.catch_up == 'burst'
+
+    def phase_time(self, index: int, count: int, update_time: float) -> float:
+        """Offset of the first measurement of bot number index of count bots"""
+        if self.phase == 'none':
+            return 0
+        if self.phase == 'even':
+            return (index + self.phase_shift) / max(count, index + 1) * update_time
+        return self.rng.uniform(0, update_time)
+
+    def first_time(self, now: float, update_time: float, phase_time: float = 0) -> float:
+        """Time of the first measurement of a bot created at now"""
+        if self.mode == 'relative':
+            return max(now, self.origin + phase_time)
+        origin = self.origin + phase_time
+        return origin + max(0, math.ceil((now - origin) / update_time)) * update_time
+
+    def jitter_time(self) -> float:
+        return self.rng.uniform(-self.jitter, self.jitter) if self.jitter else 0
+
+    def next_time(self, scheduled_time: float, now: float, update_time: float) -> float:
+        """Time of the next measurement after the one planned at scheduled_time and started at now"""
+        if self.mode == 'relative':
+            return now + update_time
+        if self.catch_up == 'burst':
+            return scheduled_time + update_time
+        missed = max(0, math.floor((now - scheduled_time) / update_time))
+        return scheduled_time + (missed + 1) * update_time
+
+    def skips(self, scheduled_time: float, now: float) -> bool:
+        """True if the measurement planned at scheduled_time is too late and must be skipped"""
+        return self.mode == 'fixed' and self.catch_up == 'skip' and now - scheduled_time > self.max_lag
+
+    def catch_up_time(self, now: float) -> float:
+        """Reserve time for one catch-up send, not earlier than now. Reserved times are 1 / burst_rate apart"""
+        catch_up_time = max(now, self._next_catch_up_time)
+        self._next_catch_up_time = catch_up_time + 1 / self.burst_rate
+        return catch_up_time
@@ -0,0 +1,51 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HttpSession:
+    """Farm-wide HTTP session with a connection pool and keep-alive.
+
+    All bots of a farm send values through one session, so connections to the server are opened
+    once and reused instead of a new TCP+TLS handshake for every request.
+
+    pool_size: max number of kept-alive connections to one host
+    timeout: timeout of every request in seconds
+    """
+
+    def __init__(self, pool_size: int = 10, timeout: float = 10) -> None:
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+
+    def get(self, url: str) -> requests.Response:
+        return self.session.get(url, timeout=self.timeout)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.session.post(url, timeout=self.timeout, **kwargs)
+
+    def stats(self) -> dict:
+        """Number of requests and how many of them reused an open connection"""
+        num_requests = 0
+        num_connections = 0
+        for key in self.adapter.poolmanager.pools.keys():
+            pool = self.adapter.poolmanager.pools[key]
+            num_requests += pool.num_requests
+            num_connections += pool.num_connections
+        reused = max(num_requests - num_connections, 0)
+        return {
+            'requests': num_requests,
+            'connections': num_connections,
+            'reused': reused,
+            'reuse_ratio': reused / num_requests if num_requests else 0.0
+        }
+
+    def report(self) -> str:
+        stats = self.stats()
+        return f"HTTP: {stats['requests']} requests, {stats['connections']} connections opened, " \
+               f"{stats['reuse_ratio']:.1%} reused"
+
+    def close(self) -> None:
+        self.session.close()
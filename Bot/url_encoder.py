@@ -0,0 +1,37 @@
+from urllib.parse import quote
+
+
+class UrlEncoder:
+    """Url of update API of a bot: base_url/update?api_key=...&<field>=<value>&...
+
+    Built once for api_key and sensors of a bot. Everything except values is quoted once into a %-format
+    template per base_url with a slot for every sensor under the field name of its config, so a send only
+    formats numbers into the template. Value of a sensor is formatted with precision of the sensor type.
+
+    Values measured before the sensors of the bot were changed (e.g. waiting for retry after config reload)
+    don't match the template and are sent as field1, field2, ... by their position.
+    """
+
+    def __init__(self, api_key: str, sensors: list) -> None:
+        self.api_key = api_key
+        self.fields = tuple(sensor.field for sensor in sensors)
+        self.query = '/update?api_key=' + quote(str(api_key), safe='').replace('%', '%%') + ''.join(
+            f"&{quote(str(sensor.field), safe='').replace('%', '%%')}=%.{sensor.precision}f" for sensor in sensors)
+        self.templates = {}  # base_url -> template
+
+    def fields_of(self, values) -> tuple:
+        """Field names of values"""
+        if len(values) == len(self.fields):
+            return self.fields
+        return tuple(f'field{num + 1}' for num in range(len(values)))
+
+    def url(self, values, base_url: str) -> str:
+        """Url to send values to server with base_url"""
+        if len(values) != len(self.fields):
+            fields = ''.join(f'&field{num + 1}={value}' for num, value in enumerate(values))
+            return f"{base_url}/update?api_key={quote(str(self.api_key), safe='')}{fields}"
+        try:
+            template = self.templates[base_url]
+        except KeyError:
+            template = self.templates[base_url] = base_url.replace('%', '%%') + self.query
+        return template % (values if type(values) is tuple else tuple(values))
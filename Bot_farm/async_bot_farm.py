@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+import aiohttp
+from Bot.bot import Bot
+from Bot.retry import PendingSend
+from Sinks.sinks import HttpSink, check_response
+from Bot_farm.bot_farm import BotFarm
+
+
+logger = logging.getLogger(__name__)
+SINK_POLL_INTERVAL = 1  # Seconds between checks of values collected by sinks
+
+
+class AsyncBotFarm(BotFarm):
+    """Bot farm where every bot is a coroutine and values are sent without blocking other bots.
+
+    All bots share one pooled aiohttp session with keep-alive. The number of requests in flight is
+    limited by 'concurrency' key of bot_farm_config (default 100).
+    A slow server response delays only the bot waiting for it. The next send time of a bot is
+    counted from the moment its send started, so the bot keeps its update_time cadence while the
+    request is in progress. Every send runs as a separate task, failed sends are retried in it
+    according to retry policy of the farm without delaying the next measurements of the bot.
+    Other sinks which wait for the network (e.g. bulk) are called in one background thread, so they don't
+    block the event loop and are still called one at a time like in BotFarm. Values collected by sinks are
+    delivered by poll_due_sinks() when they are due.
+    """
+
+    def __init__(self, bot_farm_config: dict) -> None:
+        super().__init__(bot_farm_config)
+        self.concurrency = self._concurrency
+        self._session = None
+        self._semaphore = None
+        self._sink_executor = None  # Thread for blocking sinks
+        self._tasks = {}  # id(bot) -> task of the bot coroutine
+        self._send_tasks = set()
+        self.http_stats = {'connections': 0, 'reused': 0}
+
+    @property
+    def _concurrency(self) -> int:
+        """If there is no 'concurrency' key in config - use default value"""
+        return int(self.bot_farm_config['concurrency']) if 'concurrency' in self.bot_farm_config.keys() else 100
+
+    def add_bot(self, bot_config: dict) -> Bot:
+        """Create a new bot and start its coroutine if the farm is running"""
+        bot = super().add_bot(bot_config)
+        if self._session is not None:
+            self._tasks[id(bot)] = asyncio.get_running_loop().create_task(self.run_bot(bot))
+        return bot
+
+    def remove_bot(self, bot: Bot) -> None:
+        """Stop the bot coroutine and drop the bot from the farm"""
+        super().remove_bot(bot)
+        task = self._tasks.pop(id(bot), None)
+        if task is not None:
+            task.cancel()
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        """Count opened and reused connections of the session"""
+
+        async def on_connection_create_end(session, context, params):
+            self.http_stats['connections'] += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.http_stats['reused'] += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    def http_report(self) -> str:
+        num_requests = self.http_stats['connections'] + self.http_stats['reused']
+        reuse_ratio = self.http_stats['reused'] / num_requests if num_requests else 0.0
+        return f"HTTP: {num_requests} requests, {self.http_stats['connections']} connections opened, " \
+               f"{reuse_ratio:.1%} reused"
+
+    async def try_send(self, bot: Bot, pending: PendingSend) -> bool:
+        """Make one attempt to send values. Return True if values were delivered.
+        Values for HTTP sink are sent through the aiohttp session, other blocking sinks are called in the sink
+        thread and local sinks are called directly"""
+        if not isinstance(bot.sink, HttpSink):
+            if bot.sink.blocking:
+                return await asyncio.get_running_loop().run_in_executor(self._sink_executor, bot.try_send, pending)
+            return bot.try_send(pending)
+        pending.attempts += 1
+        async with self._semaphore:
+            send_start = time.perf_counter()
+            try:
+                async with self._session.get(bot.update_url(pending.values, bot.sink.base_url)) as response:
+                    check_response(response.status, await response.read(), response.headers.get('Retry-After'))
+            except Exception as e:
+                bot.record_failure(pending, e)
+                if self.metrics is not None:
+                    self.metrics.send_latency.observe(time.perf_counter() - send_start)
+                return False
+        bot.record_sent()
+        if self.metrics is not None:
+            self.metrics.send_latency.observe(time.perf_counter() - send_start)
+        return True
+
+    async def send_all_values(self, bot: Bot, pending: PendingSend) -> None:
+        """Send measured values of the bot to server, retry with backoff or delay asked by server if request failed"""
+        while not await self.try_send(bot, pending):
+            now = time.time()
+            delay = bot.retry_delay(pending, now)
+            if delay is None:
+                logger.error('failed request, values moved to dead letters', extra={'fields': {
+                    'bot_name': bot.bot_name, 'attempts': pending.attempts, 'result': pending.result,
+                    'error': pending.error}})
+                self.dead_letters.add(bot.bot_name, pending, now)
+                return
+            logger.warning('failed request, try again', extra={'fields': {
+                'bot_name': bot.bot_name, 'attempts': pending.attempts, 'result': pending.result,
+                'error': pending.error}})
+            await asyncio.sleep(delay)
+            await self.wait_rate_limit(bot)
+            if self.metrics is not None:
+                self.metrics.retries.inc()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('update all values', extra={'fields': {'bot_name': bot.bot_name}})
+
+    async def wait_rate_limit(self, bot: Bot) -> None:
+        """Wait until rate limits of the channel and the account of the bot allow one more send"""
+        wait_time = bot.rate_limit_wait(time.time())
+        while wait_time:
+            await asyncio.sleep(wait_time)
+            wait_time = bot.rate_limit_wait(time.time())
+
+    async def run_bot(self, bot: Bot) -> None:
+        """Measure and send all values of the bot every update_time according to schedule policy of the farm"""
+        while True:
+            sleep_time = bot.next_measure_time - time.time()
+            if sleep_time > 0:
+                await asyncio.sleep(sleep_time)
+            now = time.time()
+            if self.metrics is not None:
+                self.metrics.observe_lag(bot.bot_name, now - bot.next_measure_time)
+            if self.schedule_policy.rate_limited and now - bot.next_measure_time > self.schedule_policy.max_lag:
+                catch_up_time = self.schedule_policy.catch_up_time(now)
+                if catch_up_time > now:
+                    await asyncio.sleep(catch_up_time - now)
+                    now = time.time()
+            skip = self.schedule_policy.skips(bot.next_measure_time, now)
+            bot.plan_next_measurement(now)
+            bot.next_send_time = bot.next_measure_time
+            if skip:
+                continue
+            if bot.rate_limiter is not None:
+                await self.wait_rate_limit(bot)
+                now = time.time()
+            self.tend_scheduler.tick(now)
+            bot.measure_all_sensors()
+            self.measurements += 1
+            task = asyncio.create_task(self.send_all_values(bot, PendingSend(bot.values(), now)))
+            self._send_tasks.add(task)
+            task.add_done_callback(self._send_tasks.discard)
+            if self.iterations is not None and self.measurements >= self.iterations:
+                self.stop()
+
+    async def add_bots(self) -> None:
+        """Start coroutines of bots from config one by one when their first measurement is due"""
+        while self._next_bot is not None:
+            await asyncio.sleep(max(0, self._next_bot.next_measure_time - time.time()))
+            bot = self._add_next_bot()
+            self._tasks[id(bot)] = asyncio.create_task(self.run_bot(bot))
+
+    def reload(self, bot_farm_config: dict) -> dict:
+        """Apply bots of changed config, new bots are started by a new add_bots task"""
+        counts = super().reload(bot_farm_config)
+        if self._session is not None:
+            task = self._tasks.pop('add_bots', None)
+            if task is not None:
+                task.cancel()
+            self._tasks['add_bots'] = asyncio.get_running_loop().create_task(self.add_bots())
+        return counts
+
+    async def watch(self) -> None:
+        """Check watched config file every watcher.interval"""
+        while True:
+            await asyncio.sleep(self.watcher.interval)
+            self._check_reload()
+
+    def stop(self) -> None:
+        """Cancel coroutines of all bots and the farm, sends in progress are finished by run()"""
+        for task in self._tasks.values():
+            task.cancel()
+
+    async def stop_after(self, duration: float) -> None:
+        await asyncio.sleep(duration)
+        self.stop()
+
+    async def poll_due_sinks(self) -> None:
+        """Poll sinks when values collected by them are due, at least every SINK_POLL_INTERVAL"""
+        loop = asyncio.get_running_loop()
+        while True:
+            due_time = self._sink_due_time()
+            wait_time = SINK_POLL_INTERVAL if due_time is None else min(due_time - time.time(), SINK_POLL_INTERVAL)
+            await asyncio.sleep(max(0.0, wait_time))
+            await loop.run_in_executor(self._sink_executor, self.poll_sinks, time.time())
+
+    async def save_checkpoints(self) -> None:
+        """Save checkpoint every checkpoint_interval"""
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            self.save_checkpoint()
+
+    async def run(self) -> None:
+        """Run coroutines of all bots in farm"""
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._sink_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sink')
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         trace_configs=[self._trace_config()]) as session:
+            self._session = session
+            for bot in self.bots:
+                self._tasks[id(bot)] = asyncio.create_task(self.run_bot(bot))
+            self._tasks['add_bots'] = asyncio.create_task(self.add_bots())
+            self._tasks['sinks'] = asyncio.create_task(self.poll_due_sinks())
+            if self.watcher is not None:
+                self._tasks['watch'] = asyncio.create_task(self.watch())
+            if self.checkpoint is not None:
+                self._tasks['checkpoint'] = asyncio.create_task(self.save_checkpoints())
+            if self.duration is not None:
+                self._tasks['stop'] = asyncio.create_task(self.stop_after(self.duration))
+            try:
+                while self._tasks:
+                    done, _ = await asyncio.wait(list(self._tasks.values()), return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        self._tasks = {key: value for key, value in self._tasks.items() if value is not task}
+                        if not task.cancelled():
+                            task.result()  # Raise the exception of a failed bot
+                if self._send_tasks:
+                    await asyncio.wait(list(self._send_tasks), timeout=self.timeout)
+            finally:
+                self._session = None
+                self._sink_executor.shutdown()
+                logger.info(self.http_report())
+
+    def start(self) -> None:
+        """Turn on all bots in farm. Start to measure parameters and send on server"""
+        exporter = self._start_metrics()
+        try:
+            asyncio.run(self.run())
+        finally:
+            if self.checkpoint is not None:
+                self.save_checkpoint()
+            if exporter is not None:
+                exporter.stop()
+            for sink in self.sinks.values():
+                sink.close()
+            logger.info(self.session.report())
+            self.session.close()
@@ -0,0 +1,140 @@
+import itertools
+import re
+import zlib
+from string import Formatter
+
+
+BOT_NAME_TEMPLATE = 'bot_{n}'  # Default bot_name of bots of a group
+TEMPLATE_KEYS = ('email', 'channel', 'bot_name', 'api_key')  # String values of these keys may contain {n}
+GROUP_KEYS = ('count', 'start', 'profile', 'api_key_file')  # Keys of group which are not copied to bots
+
+
+def _check_group(group: dict, profiles: dict) -> None:
+    if not isinstance(group, dict):
+        raise Exception(f"Incorrect bot_groups config. Group must be dict, but now: {type(group)}")
+    if 'count' not in group.keys():
+        raise Exception("Incorrect bot_groups config. Key 'count' is mandatory for all groups")
+    if 'profile' in group.keys() and group['profile'] not in profiles:
+        raise Exception(f"Incorrect bot_groups config. Unknown profile: {group['profile']}. "
+                        f"Avaliable: {list(profiles)}")
+
+
+def _api_keys(file_name: str):
+    """Api keys from file, one per line. The file is read line by line while bots are created"""
+    with open(file_name) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+    raise Exception(f"Incorrect bot_groups config. Not enough api keys in {file_name}")
+
+
+def _group_bot_configs(group: dict, profiles: dict, wanted=None):
+    """Bot configs of one group for numbers n from 'start' to 'start' + 'count' - 1.
+
+    Bot config is profile updated with all keys of group except GROUP_KEYS, {n} in TEMPLATE_KEYS is replaced
+    with the number of the bot. Bot configs of a group share one list of sensor configs.
+    wanted(email, channel) tells if config of the bot with email and channel is needed, others are not built.
+    """
+    _check_group(group, profiles)
+    template = {'bot_name': BOT_NAME_TEMPLATE, 'channel': '{n}'}
+    template.update(profiles[group['profile']] if 'profile' in group.keys() else {})
+    template.update({key: value for key, value in group.items() if key not in GROUP_KEYS})
+    start = int(group['start']) if 'start' in group.keys() else 1
+    api_keys = _api_keys(group['api_key_file']) if 'api_key_file' in group.keys() else itertools.repeat(None)
+    email, channel = template.get('email'), template.get('channel')
+    for index, api_key in zip(range(int(group['count'])), api_keys):
+        n = start + index
+        if wanted is not None and not wanted(email.format(n=n) if isinstance(email, str) else email,
+                                              channel.format(n=n) if isinstance(channel, str) else channel):
+            continue
+        bot_config = dict(template)
+        for key in TEMPLATE_KEYS:
+            if isinstance(bot_config.get(key), str):
+                bot_config[key] = bot_config[key].format(n=n)
+        if api_key is not None:
+            bot_config['api_key'] = api_key
+        yield bot_config
+
+
+def bot_name_template(group: dict, profiles: dict) -> str:
+    """bot_name of bots of group, {n} is replaced with the number of a bot"""
+    profile = profiles.get(group.get('profile'), {})
+    for source in (group, profile):
+        if 'bot_name' in source.keys():
+            return str(source['bot_name'])
+    return BOT_NAME_TEMPLATE
+
+
+def template_numbered(template: str) -> bool:
+    """True if names made from template differ for every number n"""
+    return any(field == 'n' for _, field, _, _ in Formatter().parse(template))
+
+
+def template_number(template: str, name: str):
+    """Number n of bot with name made from template, None if template does not make name"""
+    if not template_numbered(template):
+        return 0 if name == template else None
+    pattern = ''.join(re.escape(literal) + (r'(\d+)' if field == 'n' else '')
+                      for literal, field, _, _ in Formatter().parse(template))
+    match = re.fullmatch(pattern, name)
+    if match is None:
+        return None
+    n = int(match.group(1))
+    return n if template.format(n=n) == name else None
+
+
+def shard_by_account(bot_farm_config: dict) -> bool:
+    """True if all bots of an account must be in one shard: the account is rate limited and its limit
+    can't be split between shards. Otherwise bots are split by channel, so one account can't overload a shard"""
+    rate_limit_config = bot_farm_config['rate_limit'] if 'rate_limit' in bot_farm_config.keys() else {}
+    return 'account_interval' in rate_limit_config.keys() and float(rate_limit_config['account_interval']) > 0
+
+
+def bot_shard(email, channel, workers: int, by_account: bool = False) -> int:
+    """Number of shard of the bot with email and channel. It depends only on the bot, not on its place in config,
+    so reload of config and restart with other bots keep every bot in its shard"""
+    key = str(email) if by_account else f'{email}/{channel}'
+    return zlib.crc32(key.encode()) % workers
+
+
+def _shard_filter(bot_farm_config: dict):
+    """wanted(email, channel) of bots of the shard of config, None if config is not a shard"""
+    shard_num, workers = bot_farm_config['shard'] if 'shard' in bot_farm_config.keys() else (0, 1)
+    if workers == 1:
+        return None
+    by_account = shard_by_account(bot_farm_config)
+    return lambda email, channel: bot_shard(email, channel, workers, by_account) == shard_num
+
+
+def count_bot_configs(bot_farm_config: dict) -> int:
+    """Number of bots described by config. bot_groups are expanded only for a shard"""
+    if 'shard' in bot_farm_config.keys() and bot_farm_config['shard'][1] > 1:
+        return sum(1 for _ in iter_bot_configs(bot_farm_config))
+    total = len(bot_farm_config['bots']) if 'bots' in bot_farm_config.keys() else 0
+    if 'bot_groups' in bot_farm_config.keys():
+        total += sum(int(group['count']) for group in bot_farm_config['bot_groups'])
+    return total
+
+
+def iter_bot_configs(bot_farm_config: dict):
+    """Bot configs of 'bots' list and then of every group of 'bot_groups', built one by one on demand.
+
+    bot_groups: [{"count": 1000, "profile": "city", "start": 1, "email": "...", "api_key_file": "keys.txt"}, ...]
+    profiles: {"city": {"update_time": 300, "sensors": [...]}, ...}
+
+    With 'shard': [shard_num, workers] only bots of shard shard_num are built, see bot_shard.
+    """
+    bots_configs = bot_farm_config['bots'] if 'bots' in bot_farm_config.keys() else []
+    if not isinstance(bots_configs, list):
+        raise Exception(f"Incorrect bot_farm config file. bot_farm_config['bots'] must be list, "
+                        f"but now: {type(bots_configs)}")
+    wanted = _shard_filter(bot_farm_config)
+    for bot_config in bots_configs:
+        if wanted is None or not isinstance(bot_config, dict) or wanted(bot_config.get('email'),
+                                                                        bot_config.get('channel')):
+            yield bot_config  # Incorrect bot config is built by every shard and fails there
+
+    profiles = bot_farm_config['profiles'] if 'profiles' in bot_farm_config.keys() else {}
+    for group in bot_farm_config['bot_groups'] if 'bot_groups' in bot_farm_config.keys() else []:
+        yield from _group_bot_configs(group, profiles, wanted)
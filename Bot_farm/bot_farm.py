@@ -1,13 +1,38 @@
 from Bot.bot import Bot
+from Bot.session import HttpSession
+from Bot.retry import RetryPolicy, DeadLetterStore
+from Bot.rate_limit import RateLimiter
+from Bot.schedule import SchedulePolicy
+from Bot_farm.scheduler import Scheduler
+from Bot_farm.clock import CLOCKS, VirtualClock
+from Bot_farm.bot_configs import iter_bot_configs, count_bot_configs
+from Bot_farm.reload import ConfigWatcher, RELOAD_KEYS
+from Bot_farm.checkpoint import Checkpoint
+from Bot_farm.trajectory import prepare_trajectories, config_digest
+from Bot_farm.metrics import FarmMetrics, MetricsExporter
+from Sinks.sinks import create_sink
+from Sensors.sensors import TEND_CHANGE_TIME
+from Sensors.tend import TendScheduler
+import json
+import logging
+import math
+import random
 import time
 
 
+logger = logging.getLogger(__name__)
+
+
 class BotFarm:
     """A bot farm simulates Air Quality Monitoring System.
     Bot farm contain from bots (tne number according to config file.
 
     bot_farm_config : {'bots': [bot1_conf, ..., bot32_conf, ...]}
-        config contain all information about bots to create
+        config contain all information about bots to create. Instead of (or together with) 'bots' list
+        many similar bots can be described by 'bot_groups' and 'profiles', see iter_bot_configs
+
+    Bots are created one by one when their first measurement is due, so the farm starts at once
+    for any number of bots.
 
     bot1_conf: {..., 'sensors': [sensor_1, ..., sensor_8]}
         Every bot_conf contain all information about sensors in it (temperature, pressure, etc.).
@@ -21,44 +46,339 @@ class BotFarm:
     def __init__(self, bot_farm_config: dict) -> None:
         self.bot_farm_config = bot_farm_config
         self._check_bot_farm_config()
-        self.bots_configs = self.bot_farm_config['bots']
+        self.pool_size = self._pool_size
+        self.timeout = self._timeout
+        self.session = HttpSession(self.pool_size, self.timeout)
+        self.seed = self.bot_farm_config['seed'] if 'seed' in self.bot_farm_config.keys() else None
+        self.random = random.Random(self.seed)  # Phases, jitter and retry delays, seeded farm draws the same ones
+        self.retry_config = self.bot_farm_config['retry'] if 'retry' in self.bot_farm_config.keys() else {}
+        self.retry_policy = RetryPolicy.from_config(self.retry_config, self.random)
+        self.dead_letters = DeadLetterStore(self.retry_config.get('dead_letter_file'))
+        self.rate_limiter = RateLimiter.from_config(self.bot_farm_config['rate_limit']) \
+            if 'rate_limit' in self.bot_farm_config.keys() else None
+        self.clock = self._clock
+        self.checkpoint = self._checkpoint
+        self.trajectories = prepare_trajectories(self.bot_farm_config) \
+            if 'trajectory' in self.bot_farm_config.keys() else None
+        self.duration = self._duration
+        self.iterations = self._iterations
+        self.measurements = 0  # Measurements of all bots since start
+        self.schedule_policy = SchedulePolicy.from_config(
+            self.bot_farm_config['schedule'] if 'schedule' in self.bot_farm_config.keys() else {}, self.clock.time(),
+            self.random)
+        self.sinks = {}  # json of sink config -> sink. Bots with equal sink configs share one sink
+        self.sink = self._sink(self.bot_farm_config['sink'] if 'sink' in self.bot_farm_config.keys() else {})
+        self.tend_scheduler = TendScheduler(self._tend_change_time)
+        self.metrics = FarmMetrics(self) if 'metrics' in self.bot_farm_config.keys() else None
+        self.bots_count = count_bot_configs(self.bot_farm_config)
+        self.bots_configs = iter_bot_configs(self.bot_farm_config)
         self.bots = []
-        self._bots_initialization()
+        self.scheduler = Scheduler()
+        self.watcher = None  # ConfigWatcher if config file is watched for changes
+        self._next_bot = self._create_next_bot()  # Created bot waiting for its first measurement
+        if self._next_bot is not None:
+            self._add_next_bot()
 
     def _check_bot_farm_config(self) -> None:
-        """Check if config file was created correct"""
-        mandatory_keys = ['bots']
+        """Check if config file was created correct.
+        The whole config is checked by Config_compiler.config_compiler.compile_config"""
+        if not isinstance(self.bot_farm_config, dict):
+            raise Exception(f"Incorrect bot_farm config file. Must be dict but now: {type(self.bot_farm_config)}")
 
-        assert isinstance(self.bot_farm_config, dict), f"Incorrect bot_farm config file. Must be dict but now: \
-            {type(self.bot_farm_config)}"
+        if 'bots' not in self.bot_farm_config.keys() and 'bot_groups' not in self.bot_farm_config.keys():
+            raise Exception("Incorrect bot_farm config file. Key 'bots' or 'bot_groups' is mandatory")
 
-        for key in mandatory_keys:
-            assert key in self.bot_farm_config.keys(), f"Incorrect bot_farm config file. Key {key} is mandatory"
+    @property
+    def _pool_size(self) -> int:
+        """If there is no 'pool_size' key in config - use default value"""
+        return int(self.bot_farm_config['pool_size']) if 'pool_size' in self.bot_farm_config.keys() else 10
 
-    def _bots_initialization(self) -> None:
-        """Initialization all bots with their configs"""
+    @property
+    def _timeout(self) -> float:
+        """If there is no 'timeout' key in config - use default value"""
+        return float(self.bot_farm_config['timeout']) if 'timeout' in self.bot_farm_config.keys() else 10
 
-        assert isinstance(self.bots_configs, list), f"Incorrect bot_farm config file. bot_farm_config['bots'] " \
-                                                    f"must be dict, but now: {type(self.bots_configs)}"
+    @property
+    def _clock(self):
+        """'clock' key of config: "wall" (default) or "virtual". Virtual clock starts at 'start_time'"""
+        clock_type = self.bot_farm_config['clock'] if 'clock' in self.bot_farm_config.keys() else 'wall'
+        if clock_type not in CLOCKS:
+            raise Exception(f"Incorrect bot_farm config file. Unknown clock: {clock_type}")
+        if clock_type == 'virtual' and 'start_time' in self.bot_farm_config.keys():
+            return CLOCKS[clock_type](float(self.bot_farm_config['start_time']))
+        return CLOCKS[clock_type]()
 
-        for bot_config in self.bots_configs:
-            self.bots.append(Bot(bot_config))
+    @property
+    def _checkpoint(self):
+        """'checkpoint' key of config: {"file_name": ..., "interval": 60}. Saved state of sensors is loaded
+        at start, virtual clock without 'start_time' continues from the time of checkpoint"""
+        if 'checkpoint' not in self.bot_farm_config.keys():
+            return None
+        checkpoint_config = self.bot_farm_config['checkpoint']
+        checkpoint = Checkpoint(checkpoint_config['file_name'])
+        self.checkpoint_interval = float(checkpoint_config['interval']) if 'interval' in checkpoint_config.keys() \
+            else 60
+        self._next_checkpoint_time = time.monotonic() + self.checkpoint_interval
+        if checkpoint.load():
+            logger.info('checkpoint loaded', extra={'fields': {'file_name': checkpoint.file_name,
+                                                               'bots': len(checkpoint.index)}})
+            if isinstance(self.clock, VirtualClock) and 'start_time' not in self.bot_farm_config.keys():
+                self.clock.now = checkpoint.time
+        return checkpoint
 
-    def start(self) -> None:
-        """Turn on all bots in farm. Start to measure parameters and send on server"""
+    @property
+    def _duration(self):
+        """If there is no 'duration' key in config - the farm works endlessly"""
+        return float(self.bot_farm_config['duration']) if 'duration' in self.bot_farm_config.keys() else None
+
+    @property
+    def _iterations(self):
+        """If there is no 'iterations' key in config - the number of measurements is not limited"""
+        return int(self.bot_farm_config['iterations']) if 'iterations' in self.bot_farm_config.keys() else None
+
+    @property
+    def _tend_change_time(self) -> float:
+        """If there is no 'tend_change_time' key in config - use default value"""
+        return float(self.bot_farm_config['tend_change_time']) if 'tend_change_time' in self.bot_farm_config.keys() \
+            else TEND_CHANGE_TIME
+
+    def _sink(self, sink_config: dict):
+        """Return sink for sink_config, create it if there is no sink with such config yet"""
+        key = json.dumps(sink_config, sort_keys=True)
+        if key not in self.sinks:
+            self.sinks[key] = create_sink(sink_config, self.session)
+        return self.sinks[key]
+
+    def _create_bot(self, bot_config: dict) -> Bot:
+        """Create a bot, spread its first measurement and schedule tend changes of its sensors.
+        'sink' key of bot_config overrides the sink of the farm"""
+        sink = self._sink(bot_config['sink']) if 'sink' in bot_config.keys() else self.sink
+        bot = Bot(bot_config, self.session, self.retry_policy, self.dead_letters, sink, self.clock, self.metrics,
+                  self.schedule_policy, self.seed, self.rate_limiter)
+        bot.set_phase(self.schedule_policy.phase_time(len(self.bots), self.bots_count, bot.update_time))
+        for sensor in bot.sensors:
+            sensor.set_tend_time = self.clock.time()
+        if self.checkpoint is not None:
+            self.checkpoint.restore(bot)
+        if self.trajectories is not None:
+            self.trajectories.attach(bot)
+        for sensor in bot.sensors:
+            self.tend_scheduler.add(sensor)
+        return bot
+
+    def _create_next_bot(self):
+        """Create bot from the next config. None if all bots are created"""
+        bot_config = next(self.bots_configs, None)
+        return self._create_bot(bot_config) if bot_config is not None else None
+
+    def _add_next_bot(self) -> Bot:
+        """Put the waiting bot to the farm and create the bot after it"""
+        bot = self._next_bot
+        self.bots.append(bot)
+        self.scheduler.add(bot)
+        self._next_bot = self._create_next_bot()
+        return bot
+
+    def _add_due_bot(self) -> None:
+        """Put the waiting bot to the farm if its first measurement is not later than the first bot in schedule"""
+        if self._next_bot is not None and (not len(self.scheduler) or
+                                           self._next_bot.next_send_time <= self.scheduler.peek()[0]):
+            self._add_next_bot()
+
+    def add_bot(self, bot_config: dict) -> Bot:
+        """Create a new bot and schedule it while the farm is running"""
+        bot = self._create_bot(bot_config)
+        self.bots.append(bot)
+        self.scheduler.add(bot)
+        return bot
+
+    def remove_bot(self, bot: Bot) -> None:
+        """Stop and drop a bot from the farm"""
+        self.bots.remove(bot)
+        for sensor in bot.sensors:
+            self.tend_scheduler.remove(sensor)
+        if bot in self.scheduler:
+            self.scheduler.remove(bot)
+        if self.metrics is not None:
+            self.metrics.bot_lag.pop(bot.bot_name, None)
 
-        while True:
-            timetable = []
-            for bot in self.bots:
-                timetable.append(bot.next_send_time)
+    def _update_bot(self, bot: Bot, bot_config: dict) -> None:
+        """Apply changed config to a bot, keep state of its sensors"""
+        old_sensors = set(bot.sensors)
+        bot.update_config(bot_config, self._sink(bot_config['sink']) if 'sink' in bot_config.keys() else self.sink)
+        for sensor in old_sensors.difference(bot.sensors):
+            self.tend_scheduler.remove(sensor)
+        for sensor in set(bot.sensors).difference(old_sensors):
+            sensor.set_tend_time = self.clock.time()
+            self.tend_scheduler.add(sensor)
 
-            val, idx = min((val, idx) for (idx, val) in enumerate(timetable))
-            sleep_time = val - time.time()
+    def reload(self, bot_farm_config: dict) -> dict:
+        """Apply bots of changed config (RELOAD_KEYS) to the running farm. Bots are matched by bot_name:
+        new bots are created when due, missing bots are removed, changed bots are updated in place.
+        Other keys of config need restart of the farm. Return {"added": ..., "removed": ..., "changed": ...}
+        """
+        config = {key: value for key, value in self.bot_farm_config.items() if key not in RELOAD_KEYS}
+        config.update({key: value for key, value in bot_farm_config.items() if key in RELOAD_KEYS})
+        self.bot_farm_config = config
+        if self.trajectories is not None and config_digest(config) != self.trajectories.digest:
+            self.trajectories = None  # Bots created from the new config measure, replaying bots continue
+        new_configs = {bot_config['bot_name']: bot_config for bot_config in iter_bot_configs(config)}
+        counts = {'added': 0, 'removed': 0, 'changed': 0}
 
-            if sleep_time > 0:
-                print(f"Sleep for: {sleep_time}")
-                time.sleep(sleep_time)
-            self.bots[idx].start()
+        created = self.bots + [self._next_bot] if self._next_bot is not None else list(self.bots)
+        for bot in created:
+            bot_config = new_configs.pop(bot.bot_name, None)
+            if bot_config is None:
+                counts['removed'] += 1
+                if bot is self._next_bot:
+                    for sensor in bot.sensors:
+                        self.tend_scheduler.remove(sensor)
+                    self._next_bot = None
+                else:
+                    self.remove_bot(bot)
+            elif bot_config != bot.bot_config:
+                counts['changed'] += 1
+                self._update_bot(bot, bot_config)
 
+        counts['added'] = len(new_configs)
+        self.bots_count = len(self.bots) + (self._next_bot is not None) + len(new_configs)
+        self.bots_configs = iter(list(new_configs.values()))
+        if self._next_bot is None:
+            self._next_bot = self._create_next_bot()
+        logger.info('config reloaded', extra={'fields': counts})
+        return counts
 
+    def watch_config(self, file_name: str, interval: float = 1) -> None:
+        """Reload bots from file_name when it changes, the file is checked every interval seconds"""
+        self.watcher = ConfigWatcher(file_name, interval)
+
+    def _check_reload(self) -> None:
+        try:
+            bot_farm_config = self.watcher.poll()
+        except Exception as e:
+            logger.error('config reload failed, the farm keeps the old config', extra={'fields': {'error': str(e)}})
+            return
+        if bot_farm_config is not None:
+            self.reload(bot_farm_config)
+
+    def save_checkpoint(self) -> None:
+        """Save state of sensors of all bots to checkpoint file"""
+        bots = self.bots + [self._next_bot] if self._next_bot is not None else self.bots
+        self.checkpoint.save(bots, self.clock.time(), keep_saved=self._next_bot is not None)
+        self._next_checkpoint_time = time.monotonic() + self.checkpoint_interval
+
+    def _check_checkpoint(self) -> None:
+        if self.checkpoint is not None and time.monotonic() >= self._next_checkpoint_time:
+            self.save_checkpoint()
+
+    def stats(self) -> dict:
+        """Counters of the farm since start"""
+        stats = {
+            'bots': len(self.bots),
+            'sent': sum(bot.sent_count for bot in self.bots),
+            'failed': sum(bot.failed_count for bot in self.bots),
+            'throttled': sum(bot.throttled_count for bot in self.bots),
+            'retry_queue': sum(len(bot.retry_queue) for bot in self.bots),
+            'dead_letters': self.dead_letters.count,
+            'measurements': self.measurements
+        }
+        if self.rate_limiter is not None:
+            stats['rate_limited'] = self.rate_limiter.delayed
+        return stats
+
+    def bot_stats(self) -> dict:
+        """Attempted and effective sends of every bot: {bot_name: Bot.send_stats}"""
+        now = self.clock.time()
+        return {bot.bot_name: bot.send_stats(now) for bot in self.bots}
+
+    def _start_metrics(self):
+        """Start metrics endpoint and snapshot writer from 'metrics' key of config"""
+        if self.metrics is None:
+            return None
+        exporter = MetricsExporter.from_config(self.metrics, self.bot_farm_config['metrics'])
+        exporter.start()
+        return exporter
+
+    def step(self) -> None:
+        """Wait for the first bot in schedule, start it and put it back to schedule.
+        With watched config file the farm wakes up every watcher.interval to check it.
+        Without bots the farm only waits for reload of watched config, without watched config it does nothing.
+        A late bot with "burst" catch-up policy is put back to wait for its turn to catch up.
+        Sinks which collect values (e.g. bulk) are polled every step and wake up the farm when their values are due"""
+
+        self._add_due_bot()
+        self.poll_sinks(self.clock.time())
+        if self.watcher is not None:
+            self._check_reload()
+            self._add_due_bot()
+            wait_time = (self.scheduler.peek()[0] if len(self.scheduler) else math.inf) - self.clock.time()
+            if wait_time > self.watcher.interval:
+                self.clock.sleep(self.watcher.interval)
+                return
+        if not len(self.scheduler):
+            return
+        due_time = self._sink_due_time()
+        if due_time is not None and due_time < self.scheduler.peek()[0]:
+            self.clock.sleep(max(0.0, due_time - self.clock.time()))  # Values of sinks are delivered next step
+            return
+        next_send_time, bot = self.scheduler.pop()
+        sleep_time = next_send_time - self.clock.time()
+
+        if sleep_time > 0:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('sleep', extra={'fields': {'seconds': sleep_time}})
+            self.clock.sleep(sleep_time)
+        now = self.clock.time()
+        if self.metrics is not None:
+            self.metrics.observe_lag(bot.bot_name, now - next_send_time)
+        if self.schedule_policy.rate_limited and now - next_send_time > self.schedule_policy.max_lag:
+            catch_up_time = self.schedule_policy.catch_up_time(now)
+            if catch_up_time > now:
+                bot.next_send_time = catch_up_time
+                self.scheduler.add(bot)
+                return
+        self.tend_scheduler.tick(now)
+        if bot.start():
+            self.measurements += 1
+        self.scheduler.add(bot)
+        self._check_checkpoint()
+
+    def _sink_due_time(self):
+        """The earliest time when values collected by sinks are due, None if no values wait"""
+        due_times = [due_time for due_time in (sink.due_time() for sink in self.sinks.values())
+                     if due_time is not None]
+        return min(due_times) if due_times else None
+
+    def poll_sinks(self, now: float) -> None:
+        """Deliver values collected by sinks which are due at time now"""
+        for sink in self.sinks.values():
+            sink.poll(now)
+
+    def start(self) -> None:
+        """Turn on all bots in farm. Start to measure parameters and send on server.
+        Stop after 'duration' seconds or 'iterations' measurements if they are set.
+        Stop when there are no bots left and config is not watched, so no bots can be added"""
 
+        end_time = self.clock.time() + self.duration if self.duration is not None else None
+        exporter = self._start_metrics()
+        try:
+            while self.iterations is None or self.measurements < self.iterations:
+                self._add_due_bot()
+                if not len(self.scheduler) and self.watcher is None:
+                    logger.warning('no bots to run, farm stopped')
+                    break
+                next_send_time = self.scheduler.peek()[0] if len(self.scheduler) else self.clock.time()
+                if end_time is not None and next_send_time >= end_time:
+                    if isinstance(self.clock, VirtualClock):
+                        self.clock.sleep(end_time - self.clock.time())  # Checkpoint continues from end_time
+                    break
+                self.step()
+        finally:
+            if self.checkpoint is not None:
+                self.save_checkpoint()
+            if exporter is not None:
+                exporter.stop()
+            for sink in self.sinks.values():
+                sink.close()
+            logger.info(self.session.report())
+            self.session.close()
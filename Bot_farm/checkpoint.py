@@ -0,0 +1,111 @@
+import json
+import os
+import struct
+from array import array
+from Sensors.sensors import SENSORS, TEND_NAMES, TEND_INDEX
+from Sensors.streams import seek, used
+
+
+MAGIC = b'BFCP'
+VERSION = 2
+HEADER = struct.Struct('<4sHIQd')  # magic, version, length of json index, number of sensors, farm time
+SENSOR_CODES = {sensor: num for num, sensor in enumerate(SENSORS.values())}
+
+
+class Checkpoint:
+    """State of all sensors of a farm in a binary file: current value, tend and time of the last tend change.
+
+    File: HEADER, json index [[bot_name, number of sensors], ...] and 6 arrays for all sensors in the order
+    of the index: sensor type codes (b), tend indexes (b), current values (d), set_tend_time (d) and numbers
+    used from the random stream of measures (Q) and of tend changes (Q), so a seeded farm continues
+    the same series after restart.
+    The file is written to a temporary file and renamed, so a crash during save keeps the previous checkpoint.
+
+    Bots of a farm are created on demand, restore() puts saved state into every new bot with a saved bot_name.
+    """
+
+    def __init__(self, file_name: str) -> None:
+        self.file_name = file_name
+        self.time = None  # Farm time of loaded checkpoint
+        self.index = {}  # bot_name -> (position of the first sensor, number of sensors)
+        self.bot_names = []
+        self.types = self.tends = self.values = self.tend_times = None
+        self.draws = self.tend_draws = None
+
+    def load(self) -> bool:
+        """Read checkpoint file. Return False if there is no file"""
+        if not os.path.isfile(self.file_name):
+            return False
+        with open(self.file_name, 'rb') as f:
+            magic, version, index_size, sensors_count, self.time = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise Exception(f"Incorrect checkpoint file {self.file_name}. Unknown format")
+            bots = json.loads(f.read(index_size))
+            self.types, self.tends = array('b'), array('b')
+            self.values, self.tend_times = array('d'), array('d')
+            self.draws, self.tend_draws = array('Q'), array('Q')
+            for column in (self.types, self.tends, self.values, self.tend_times, self.draws, self.tend_draws):
+                column.fromfile(f, sensors_count)
+        position = 0
+        for bot_name, count in bots:
+            self.index[bot_name] = (position, count)
+            self.bot_names.append(bot_name)
+            position += count
+        return True
+
+    def restore(self, bot) -> bool:
+        """Put saved state to sensors of the bot. Return False if there is no state of the bot or its
+        sensors were changed"""
+        if bot.bot_name not in self.index:
+            return False
+        position, count = self.index[bot.bot_name]
+        if count != len(bot.sensors) or any(self.types[position + num] != SENSOR_CODES[type(sensor)]
+                                            for num, sensor in enumerate(bot.sensors)):
+            return False
+        for num, sensor in enumerate(bot.sensors):
+            sensor.current_value = min(max(self.values[position + num], sensor.min_value), sensor.max_value)
+            sensor.tend = TEND_NAMES[self.tends[position + num]]
+            sensor.set_tend_time = self.tend_times[position + num]
+            seek(sensor, self.draws[position + num])
+            sensor.tend_draws = self.tend_draws[position + num]
+        return True
+
+    def _saved_bot(self, bot_name: str):
+        """Columns of saved sensors of a bot which is not created yet"""
+        position, count = self.index[bot_name]
+        end = position + count
+        return (self.types[position:end], self.tends[position:end], self.values[position:end],
+                self.tend_times[position:end], self.draws[position:end], self.tend_draws[position:end])
+
+    def save(self, bots, now: float, keep_saved: bool = False) -> None:
+        """Write state of sensors of bots. keep_saved - also keep loaded state of bots which are not in bots"""
+        columns = array('b'), array('b'), array('d'), array('d'), array('Q'), array('Q')
+        types, tends, values, tend_times, draws, tend_draws = columns
+        index = []
+        for bot in bots:
+            index.append([bot.bot_name, len(bot.sensors)])
+            replayed = bot.step if bot.trajectory is not None else None  # Measures replayed from trajectory
+            for sensor in bot.sensors:
+                types.append(SENSOR_CODES[type(sensor)])
+                tends.append(TEND_INDEX[sensor.tend])
+                values.append(sensor.current_value)
+                tend_times.append(sensor.set_tend_time)
+                draws.append(used(sensor) if replayed is None else replayed)
+                tend_draws.append(sensor.tend_draws)
+        if keep_saved and self.bot_names:
+            bot_names = {bot_name for bot_name, _ in index}
+            for bot_name in self.bot_names:
+                if bot_name not in bot_names:
+                    index.append([bot_name, self.index[bot_name][1]])
+                    for column, saved in zip(columns, self._saved_bot(bot_name)):
+                        column.extend(saved)
+        index_data = json.dumps(index).encode()
+        temp_file = self.file_name + '.tmp'
+        with open(temp_file, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(index_data), len(types), now))
+            f.write(index_data)
+            for column in columns:
+                column.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.file_name)
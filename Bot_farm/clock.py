@@ -0,0 +1,34 @@
+import time
+
+
+class Clock:
+    """Wall clock. Bot farm reads time and sleeps only through its clock"""
+
+    def time(self) -> float:
+        return time.time()
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+
+class VirtualClock(Clock):
+    """Simulated clock for accelerated runs. sleep() jumps straight to the wake up time.
+
+    start_time: timestamp of the simulation start (default - current time)
+    """
+
+    def __init__(self, start_time: float = None) -> None:
+        self.now = start_time if start_time is not None else time.time()
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            self.now += seconds
+
+
+CLOCKS = {
+    'wall': Clock,
+    'virtual': VirtualClock
+}
@@ -0,0 +1,101 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+
+
+LEVELS = {
+    'DEBUG': logging.DEBUG,
+    'INFO': logging.INFO,
+    'WARNING': logging.WARNING,
+    'ERROR': logging.ERROR
+}
+
+
+class SamplingFilter(logging.Filter):
+    """Pass only sample_rate part of DEBUG records. Records of other levels always pass.
+    Records are sampled with own generator, a seeded farm keeps the same records"""
+
+    def __init__(self, sample_rate: float, seed=None) -> None:
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.random = random.Random(seed)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.sample_rate >= 1:
+            return True
+        return self.random.random() < self.sample_rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One json line per record: {"time": ..., "level": ..., "logger": ..., "message": ..., **fields}
+
+    Structured fields are passed to logger as extra={'fields': {...}}
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = {
+            'time': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        line.update(getattr(record, 'fields', {}))
+        return json.dumps(line)
+
+
+class TextFormatter(logging.Formatter):
+    """Text line with structured fields appended as key=value"""
+
+    def __init__(self) -> None:
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        return line
+
+
+def setup_logging(logging_config: dict = None, seed=None) -> logging.handlers.QueueListener:
+    """Configure logging of the farm from 'logging' part of bot_farm_config:
+    {"level": "INFO", "sample_rate": 1.0, "format": "text", "file_name": null}
+    seed - 'seed' of bot_farm_config for sampling of DEBUG records
+
+    Records are put to a queue and written by a background thread, so the farm loop never waits
+    for stdout or disk. Per-sensor and per-send records are DEBUG and skipped at default level.
+    """
+    logging_config = logging_config if logging_config is not None else {}
+    if not isinstance(logging_config, dict):
+        raise TypeError(f"Incorrect logging config. Must be dict, but now: {type(logging_config)}")
+    level = logging_config['level'] if 'level' in logging_config.keys() else 'INFO'
+    if level not in LEVELS:
+        raise ValueError(f"Incorrect logging config. Unknown level: {level}. Avaliable: {list(LEVELS)}")
+    log_format = logging_config['format'] if 'format' in logging_config.keys() else 'text'
+    if log_format not in ('text', 'json'):
+        raise ValueError(f"Incorrect logging config. Unknown format: {log_format}")
+    sample_rate = float(logging_config['sample_rate']) if 'sample_rate' in logging_config.keys() else 1.0
+
+    if 'file_name' in logging_config.keys() and logging_config['file_name']:
+        handler = logging.FileHandler(logging_config['file_name'])
+    else:
+        handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if log_format == 'json' else TextFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_rate, seed))
+
+    root = logging.getLogger()
+    for old_handler in root.handlers[:]:
+        root.removeHandler(old_handler)
+    root.addHandler(queue_handler)
+    root.setLevel(LEVELS[level])
+
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,251 @@
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LAG_BUCKETS = (0.001, 0.01, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+MEASURE_BUCKETS = (1e-7, 2.5e-7, 5e-7, 1e-6, 2.5e-6, 5e-6, 1e-5, 1e-4)
+TOP_LAGGING_BOTS = 10
+
+
+class Counter:
+
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def expose(self) -> list:
+        return [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter', f'{self.name} {self.value}']
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge:
+    """Gauge with a value read from function on every exposition"""
+
+    def __init__(self, name: str, help_text: str, function) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.function = function
+
+    def expose(self) -> list:
+        return [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} gauge', f'{self.name} {self.function()}']
+
+    def snapshot(self):
+        return self.function()
+
+
+class Histogram:
+    """Histogram with fixed buckets, optionally split by one label"""
+
+    def __init__(self, name: str, help_text: str, buckets: tuple, label: str = None) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.label = label
+        self.series = {}  # label value -> [bucket counts..., count, sum]
+        self.max = {}  # label value -> max observed value
+
+    def observe(self, value: float, label_value: str = '') -> None:
+        series = self.series.get(label_value)
+        if series is None:
+            series = self.series[label_value] = [0] * (len(self.buckets) + 2)
+            self.max[label_value] = value
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+        if value > self.max[label_value]:
+            self.max[label_value] = value
+
+    def _labels(self, label_value: str, extra: str = '') -> str:
+        labels = [f'{self.label}="{label_value}"'] if self.label else []
+        if extra:
+            labels.append(extra)
+        return '{' + ','.join(labels) + '}' if labels else ''
+
+    def expose(self) -> list:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        # Exporter thread reads series while the farm observes: iterate over copies
+        for label_value, series in sorted(list(self.series.items())):
+            series = series[:]
+            cumulative = 0
+            for bucket, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="' + str(bucket) + '"'
+                lines.append(f'{self.name}_bucket{self._labels(label_value, le)} {cumulative}')
+            count = cumulative + series[len(self.buckets)]
+            le = 'le="+Inf"'
+            lines.append(f'{self.name}_bucket{self._labels(label_value, le)} {count}')
+            lines.append(f'{self.name}_count{self._labels(label_value)} {count}')
+            lines.append(f'{self.name}_sum{self._labels(label_value)} {series[-1]}')
+        return lines
+
+    def count(self, label_value: str = '') -> int:
+        series = self.series.get(label_value)
+        return sum(series[:-1]) if series is not None else 0
+
+    def mean(self, label_value: str = '') -> float:
+        count = self.count(label_value)
+        return self.series[label_value][-1] / count if count else 0.0
+
+    def quantile(self, q: float, label_value: str = '') -> float:
+        """Estimate of q-quantile by linear interpolation inside its bucket, like histogram_quantile of Prometheus.
+        The estimate is not greater than the max observed value"""
+        count = self.count(label_value)
+        if not count:
+            return 0.0
+        series = self.series[label_value]
+        rank = q * count
+        cumulative = 0
+        for num, bucket in enumerate(self.buckets):
+            if series[num] and cumulative + series[num] >= rank:
+                lower = self.buckets[num - 1] if num else 0.0
+                return min(lower + (bucket - lower) * (rank - cumulative) / series[num], self.max[label_value])
+            cumulative += series[num]
+        return self.max[label_value]
+
+    def snapshot(self) -> dict:
+        snapshot = {}
+        for label_value, series in list(self.series.items()):
+            series = series[:]
+            count = sum(series[:-1])
+            snapshot[label_value or 'all'] = {
+                'count': count,
+                'sum': series[-1],
+                'mean': series[-1] / count if count else 0.0,
+                'buckets': dict(zip([str(bucket) for bucket in self.buckets] + ['+Inf'], series[:-1]))
+            }
+        return snapshot
+
+
+class FarmMetrics:
+    """Counters and histograms of farm health: sends, retries, send latency, schedule lag
+    (actual start of a bot minus its next_send_time), measure cost per sensor type and queue depth.
+    """
+
+    def __init__(self, farm) -> None:
+        self.farm = farm
+        self.sends = Counter('bot_farm_sends_total', 'Delivered sends')
+        self.failures = Counter('bot_farm_send_failures_total', 'Failed send attempts')
+        self.throttled = Counter('bot_farm_throttled_total', 'Send attempts throttled by server')
+        self.rejected = Counter('bot_farm_rejected_total', 'Sends rejected by server for auth or client errors')
+        self.retries = Counter('bot_farm_retries_total', 'Retries of failed sends')
+        self.send_latency = Histogram('bot_farm_send_latency_seconds', 'Time of one send attempt', LATENCY_BUCKETS)
+        self.schedule_lag = Histogram('bot_farm_schedule_lag_seconds', 'Start of a bot minus its next_send_time',
+                                      LAG_BUCKETS)
+        self.measure_cost = Histogram('bot_farm_measure_seconds', 'Cost of one sensor measure', MEASURE_BUCKETS,
+                                      label='sensor')
+        self.metrics = [
+            self.sends, self.failures, self.throttled, self.rejected, self.retries,
+            Gauge('bot_farm_dead_letters', 'Values not delivered after all attempts',
+                  lambda: self.farm.dead_letters.count),
+            Gauge('bot_farm_bots', 'Bots in the farm', lambda: len(self.farm.bots)),
+            Gauge('bot_farm_scheduled_bots', 'Bots waiting in the scheduler', lambda: len(self.farm.scheduler)),
+            Gauge('bot_farm_retry_queue_depth', 'Failed sends waiting for retry',
+                  lambda: sum(len(bot.retry_queue) for bot in list(self.farm.bots))),
+            self.send_latency, self.schedule_lag, self.measure_cost
+        ]
+        self.bot_lag = {}  # bot_name -> last schedule lag
+
+    def observe_lag(self, bot_name: str, lag: float) -> None:
+        self.schedule_lag.observe(lag)
+        self.bot_lag[bot_name] = lag
+
+    def top_lagging_bots(self) -> list:
+        return sorted(list(self.bot_lag.items()), key=lambda item: item[1], reverse=True)[:TOP_LAGGING_BOTS]
+
+    def expose(self) -> str:
+        """Metrics in Prometheus text format"""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.expose())
+        lines.append('# HELP bot_farm_bot_schedule_lag_seconds Last schedule lag of the most lagging bots')
+        lines.append('# TYPE bot_farm_bot_schedule_lag_seconds gauge')
+        for bot_name, lag in self.top_lagging_bots():
+            lines.append(f'bot_farm_bot_schedule_lag_seconds{{bot="{bot_name}"}} {lag}')
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> dict:
+        snapshot = {'time': time.time()}
+        for metric in self.metrics:
+            snapshot[metric.name] = metric.snapshot()
+        snapshot['top_lagging_bots'] = dict(self.top_lagging_bots())
+        return snapshot
+
+
+class MetricsExporter:
+    """Expose FarmMetrics on http://host:port/metrics and/or write snapshot_file every snapshot_interval
+    seconds. Works in background threads, the farm loop only updates counters.
+    """
+
+    def __init__(self, metrics: FarmMetrics, port: int = None, host: str = '127.0.0.1',
+                 snapshot_file: str = None, snapshot_interval: float = 10) -> None:
+        self.metrics = metrics
+        self.port = port
+        self.host = host
+        self.snapshot_file = snapshot_file
+        self.snapshot_interval = snapshot_interval
+        self.server = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_config(cls, metrics: FarmMetrics, metrics_config: dict) -> 'MetricsExporter':
+        """Create exporter from 'metrics' part of bot_farm_config"""
+        if not isinstance(metrics_config, dict):
+            raise TypeError(f"Incorrect metrics config. Must be dict, but now: {type(metrics_config)}")
+        return cls(
+            metrics,
+            port=int(metrics_config['port']) if 'port' in metrics_config.keys() else None,
+            host=metrics_config['host'] if 'host' in metrics_config.keys() else '127.0.0.1',
+            snapshot_file=metrics_config['snapshot_file'] if 'snapshot_file' in metrics_config.keys() else None,
+            snapshot_interval=float(metrics_config['snapshot_interval'])
+            if 'snapshot_interval' in metrics_config.keys() else 10
+        )
+
+    def start(self) -> None:
+        if self.port is not None:
+            metrics = self.metrics
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self) -> None:
+                    body = metrics.expose().encode()
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args) -> None:
+                    pass
+
+            self.server = ThreadingHTTPServer((self.host, self.port), MetricsHandler)
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        if self.snapshot_file is not None:
+            threading.Thread(target=self._write_snapshots, daemon=True).start()
+
+    def write_snapshot(self) -> None:
+        """Write snapshot to a temporary file and replace snapshot_file, readers never see a partial file"""
+        temp_file = self.snapshot_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump(self.metrics.snapshot(), f)
+        os.replace(temp_file, self.snapshot_file)
+
+    def _write_snapshots(self) -> None:
+        while not self._stop.wait(self.snapshot_interval):
+            self.write_snapshot()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        if self.snapshot_file is not None:
+            self.write_snapshot()
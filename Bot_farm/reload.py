@@ -0,0 +1,36 @@
+import os
+import time
+from Config_compiler.config_compiler import load_config
+
+
+RELOAD_KEYS = ('bots', 'bot_groups', 'profiles')  # Keys of config applied without restart
+
+
+class ConfigWatcher:
+    """Check config file every interval seconds of wall time. poll() returns compiled config when the file
+    was changed, None otherwise. Raises ConfigError if the changed file has errors.
+    """
+
+    def __init__(self, file_name: str, interval: float = 1) -> None:
+        self.file_name = file_name
+        self.interval = interval
+        self._stat = self._file_stat()
+        self._next_check_time = time.monotonic() + interval
+
+    def _file_stat(self):
+        try:
+            stat = os.stat(self.file_name)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def poll(self):
+        now = time.monotonic()
+        if now < self._next_check_time:
+            return None
+        self._next_check_time = now + self.interval
+        stat = self._file_stat()
+        if stat is None or stat == self._stat:
+            return None
+        self._stat = stat
+        return load_config(self.file_name)
@@ -0,0 +1,62 @@
+import heapq
+import itertools
+
+
+class Scheduler:
+    """Priority queue of bots keyed by their next_send_time.
+
+    Dispatching the next bot costs O(log N) instead of scanning the whole farm on every loop pass.
+    Bots can be added or removed while the farm is running. Removed bots are dropped lazily when
+    they reach the top of the heap.
+
+    Entry in heap: [next_send_time, sequence_num, bot]
+        sequence_num keeps the order stable for bots with equal next_send_time and prevents
+        comparison of Bot objects.
+    """
+
+    def __init__(self, bots=()) -> None:
+        self._heap = []
+        self._entries = {}  # id(bot) -> heap entry
+        self._counter = itertools.count()
+        for bot in bots:
+            self.add(bot)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, bot) -> bool:
+        return id(bot) in self._entries
+
+    def add(self, bot) -> None:
+        """Add bot to the schedule or move it according to its current next_send_time"""
+        if id(bot) in self._entries:
+            self.remove(bot)
+        entry = [bot.next_send_time, next(self._counter), bot]
+        self._entries[id(bot)] = entry
+        heapq.heappush(self._heap, entry)
+
+    def remove(self, bot) -> None:
+        """Remove bot from the schedule. The heap entry is only marked as removed"""
+        entry = self._entries.pop(id(bot))
+        entry[-1] = None
+
+    def _drop_removed(self) -> None:
+        while self._heap and self._heap[0][-1] is None:
+            heapq.heappop(self._heap)
+
+    def peek(self):
+        """Return (next_send_time, bot) of the first bot in schedule without removing it"""
+        self._drop_removed()
+        if not self._heap:
+            raise IndexError("Schedule is empty")
+        next_send_time, _, bot = self._heap[0]
+        return next_send_time, bot
+
+    def pop(self):
+        """Remove and return (next_send_time, bot) of the first bot in schedule"""
+        self._drop_removed()
+        if not self._heap:
+            raise IndexError("Schedule is empty")
+        next_send_time, _, bot = heapq.heappop(self._heap)
+        del self._entries[id(bot)]
+        return next_send_time, bot
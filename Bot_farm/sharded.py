@@ -0,0 +1,186 @@
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from Bot_farm.bot_farm import BotFarm
+from Bot_farm.logs import setup_logging
+from Bot_farm.bot_configs import count_bot_configs
+from Bot_farm.trajectory import prepare_trajectories
+
+
+logger = logging.getLogger(__name__)
+
+
+# Stats which keep growing after restart of a shard
+COUNTERS = ('sent', 'failed', 'throttled', 'dead_letters', 'measurements', 'rate_limited')
+
+
+def run_shard(farm_class, shard_config: dict, shard_num: int, stats_queue, report_interval: float,
+              watch=None) -> None:
+    """Worker process: run one BotFarm and report its stats every report_interval, stats of every bot at the end.
+    watch: (file_name, interval) of config file to reload bots of the shard from"""
+    setup_logging(shard_config['logging'] if 'logging' in shard_config.keys() else None,
+                  shard_config['seed'] if 'seed' in shard_config.keys() else None)
+    farm = farm_class(shard_config)
+    if watch is not None:
+        farm.watch_config(*watch)
+
+    def report() -> None:
+        while True:
+            time.sleep(report_interval)
+            stats_queue.put((shard_num, os.getpid(), farm.stats(), None))
+
+    threading.Thread(target=report, daemon=True).start()
+    farm.start()
+    # Final stats of a shard stopped by duration
+    stats_queue.put((shard_num, os.getpid(), farm.stats(), farm.bot_stats()))
+
+
+class ShardSupervisor:
+    """Split bots of bot_farm_config across worker processes, each worker runs its own bot farm.
+
+    Bots are distributed by hash of their channel (or of their account if it is rate limited, see bot_shard),
+    so shards get about equal number of bots and a bot stays in its shard after reload. The supervisor restarts
+    dead shards and combines stats of all shards. Shards which finished (exit code 0, e.g. after 'duration')
+    are not restarted, the supervisor returns when all shards are finished.
+
+    bot_farm_config: config of the whole farm. 'workers' key - number of shards (default - number of CPUs)
+    farm_class: BotFarm or its subclass to run in every shard
+    """
+
+    def __init__(self, bot_farm_config: dict, farm_class=BotFarm, report_interval: float = 10) -> None:
+        self.bot_farm_config = bot_farm_config
+        self.farm_class = farm_class
+        self.report_interval = report_interval
+        self.workers = self._workers
+        self.shard_configs = self._split_config()
+        self.stats_queue = multiprocessing.Queue()
+        self.processes = {}  # shard_num -> Process
+        self.shard_stats = {}  # shard_num -> last stats of current process
+        self.shard_bot_stats = {}  # shard_num -> stats of bots of finished process
+        self.retired_stats = {}  # Sum of counters of dead processes
+        self.restarts = 0
+        self.finished = set()  # Numbers of shards which stopped normally
+        self.watch = None  # (file_name, interval) of watched config file
+
+    @property
+    def _workers(self) -> int:
+        """If there is no 'workers' key in config - use number of CPUs"""
+        if 'workers' in self.bot_farm_config.keys():
+            return int(self.bot_farm_config['workers'])
+        return multiprocessing.cpu_count()
+
+    def _split_config(self) -> list:
+        """Configs of shards. Every shard builds only its bots, see iter_bot_configs"""
+        workers = min(self.workers, count_bot_configs(self.bot_farm_config))
+        shard_configs = []
+        for shard_num in range(workers):
+            shard_config = dict(self.bot_farm_config)
+            shard_config['shard'] = [shard_num, workers]
+            shard_config['workers'] = 1
+            if 'schedule' in self.bot_farm_config.keys():
+                # Every shard spreads its bots evenly, shift "even" phases of shards so they don't start at once
+                shard_config['schedule'] = dict(self.bot_farm_config['schedule'], phase_shift=shard_num / workers)
+            if 'iterations' in self.bot_farm_config.keys():
+                shard_config['iterations'] = len(range(shard_num, int(self.bot_farm_config['iterations']), workers))
+            if 'metrics' in self.bot_farm_config.keys():
+                shard_config['metrics'] = self._shard_metrics_config(shard_num)
+            if 'checkpoint' in self.bot_farm_config.keys():
+                checkpoint_config = self.bot_farm_config['checkpoint']
+                shard_config['checkpoint'] = dict(checkpoint_config,
+                                                  file_name=f"{checkpoint_config['file_name']}.{shard_num}")
+            shard_configs.append(shard_config)
+        return shard_configs
+
+    def _shard_metrics_config(self, shard_num: int) -> dict:
+        """Every shard exposes its metrics on port + shard_num and writes its own snapshot file"""
+        metrics_config = dict(self.bot_farm_config['metrics'])
+        if 'port' in metrics_config.keys():
+            metrics_config['port'] = int(metrics_config['port']) + shard_num
+        if 'snapshot_file' in metrics_config.keys():
+            metrics_config['snapshot_file'] = f"{metrics_config['snapshot_file']}.{shard_num}"
+        return metrics_config
+
+    def watch_config(self, file_name: str, interval: float = 1) -> None:
+        """Every shard reloads its bots from file_name when it changes. Number of shards stays the same"""
+        self.watch = (file_name, interval)
+
+    def _start_shard(self, shard_num: int) -> None:
+        process = multiprocessing.Process(
+            target=run_shard,
+            args=(self.farm_class, self.shard_configs[shard_num], shard_num, self.stats_queue, self.report_interval,
+                  self.watch),
+            name=f'bot_farm_shard_{shard_num}',
+            daemon=True
+        )
+        process.start()
+        self.processes[shard_num] = process
+
+    def _restart_dead_shards(self) -> None:
+        for shard_num, process in list(self.processes.items()):
+            if process.is_alive() or shard_num in self.finished:
+                continue
+            if process.exitcode == 0:
+                self.finished.add(shard_num)
+                continue
+            logger.warning('shard died, restart', extra={'fields': {'shard': shard_num, 'exit_code': process.exitcode}})
+            last_stats = self.shard_stats.pop(shard_num, {})
+            for key in COUNTERS:
+                self.retired_stats[key] = self.retired_stats.get(key, 0) + last_stats.get(key, 0)
+            self.restarts += 1
+            self._start_shard(shard_num)
+
+    def _collect_stats(self, timeout: float) -> None:
+        """Wait for stats of shards for timeout seconds or until all shards are stopped"""
+        deadline = time.time() + timeout
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return
+            try:
+                shard_num, pid, stats, bot_stats = self.stats_queue.get(timeout=min(remaining, 1))
+            except queue.Empty:
+                if not any(process.is_alive() for process in self.processes.values()):
+                    return
+                continue
+            if self.processes[shard_num].pid == pid:  # Skip stats sent by a dead process
+                self.shard_stats[shard_num] = stats
+                if bot_stats is not None:
+                    self.shard_bot_stats[shard_num] = bot_stats
+
+    def stats(self) -> dict:
+        """Combined stats of all shards since start"""
+        stats = dict(self.retired_stats)
+        for shard_stats in self.shard_stats.values():
+            for key, value in shard_stats.items():
+                stats[key] = stats.get(key, 0) + value
+        stats['shards'] = len(self.processes)
+        stats['restarts'] = self.restarts
+        return stats
+
+    def bot_stats(self) -> dict:
+        """Stats of every bot of finished shards, see BotFarm.bot_stats"""
+        bot_stats = {}
+        for shard_bot_stats in self.shard_bot_stats.values():
+            bot_stats.update(shard_bot_stats)
+        return bot_stats
+
+    def start(self) -> None:
+        """Start all shards and supervise them"""
+        if 'trajectory' in self.bot_farm_config.keys():
+            prepare_trajectories(self.bot_farm_config)  # Built once, shards map the same file
+        for shard_num in range(len(self.shard_configs)):
+            self._start_shard(shard_num)
+        try:
+            while len(self.finished) < len(self.processes):
+                self._collect_stats(self.report_interval)
+                self._restart_dead_shards()
+                logger.info('farm stats', extra={'fields': self.stats()})
+            self._collect_stats(0.1)  # Final stats of the last finished shards
+        finally:
+            for process in self.processes.values():
+                process.terminate()
+            for process in self.processes.values():
+                process.join()
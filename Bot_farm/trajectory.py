@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import struct
+from array import array
+import numpy as np
+from Bot_farm.bot_configs import iter_bot_configs
+from Bot_farm.checkpoint import SENSOR_CODES
+from Sensors.sensors import SENSORS, TEND_CHANGE_TIME
+from Sensors.streams import stream_key
+from Sensors.vectorized import SensorArray
+
+
+MAGIC = b'BFTR'
+VERSION = 1
+HEADER = struct.Struct('<4sH16sIQQQ')  # magic, version, config digest, length of json index, steps, sensors, offset
+ALIGN = 64  # Trajectories start at offset aligned to ALIGN bytes
+DIGEST_KEYS = ('bots', 'bot_groups', 'profiles', 'seed', 'tend_change_time')  # Keys of config trajectories depend on
+STEPS = 1000  # Default number of precomputed measures of every sensor
+
+
+def config_digest(bot_farm_config: dict) -> bytes:
+    """Digest of the part of config which trajectories depend on. Equal for all shards of a farm"""
+    data = json.dumps({key: bot_farm_config.get(key) for key in DIGEST_KEYS}, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode()).digest()[:16]
+
+
+class TrajectoryCache:
+    """Values of every measure of every sensor of a farm for the first steps measures, precomputed once into
+    a file and replayed by bots from a read only memory map.
+
+    File: HEADER, json index [[bot_name, number of sensors], ...], sensor type codes (b) of all sensors in
+    the order of the index and, from offset, float64 array of shape (steps, sensors). Row n has values of
+    the measure number n of all sensors, sensors of a bot are neighbour columns, so the values of a bot are a
+    slice of the row without copy. Processes which map the same file share its pages.
+
+    Trajectories are built by SensorArray from the random streams of sensors, so with 'seed' in config
+    they are the values which bots would measure. Tend of a sensor changes every tend_change_time of its
+    measures (measure n is n * update_time after the first one).
+    """
+
+    def __init__(self, file_name: str) -> None:
+        self.file_name = file_name
+        self.digest = None
+        self.steps = 0
+        self.index = {}  # bot_name -> (first column, number of sensors)
+        self.types = None
+        self.trajectories = None
+
+    def load(self, digest: bytes = None, steps: int = 0) -> bool:
+        """Map trajectories file. Return False if there is no file, it was built for another config (digest)
+        or has less than steps steps"""
+        if not os.path.isfile(self.file_name):
+            return False
+        with open(self.file_name, 'rb') as f:
+            magic, version, file_digest, index_size, file_steps, sensors_count, offset = \
+                HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise Exception(f"Incorrect trajectory file {self.file_name}. Unknown format")
+            if (digest is not None and file_digest != digest) or file_steps < steps:
+                return False
+            bots = json.loads(f.read(index_size))
+            self.types = array('b')
+            self.types.fromfile(f, sensors_count)
+        self.digest = file_digest
+        self.steps = file_steps
+        self.index = {}
+        column = 0
+        for bot_name, count in bots:
+            self.index[bot_name] = (column, count)
+            column += count
+        self.trajectories = np.memmap(self.file_name, dtype='<f8', mode='r', offset=offset,
+                                      shape=(file_steps, sensors_count))
+        return True
+
+    def attach(self, bot) -> bool:
+        """Replay trajectories of the bot. Return False if there are no trajectories of the bot or its
+        sensors were changed"""
+        if bot.bot_name not in self.index:
+            return False
+        column, count = self.index[bot.bot_name]
+        if count != len(bot.sensors) or any(self.types[column + num] != SENSOR_CODES[type(sensor)]
+                                            for num, sensor in enumerate(bot.sensors)):
+            return False
+        # Plain ndarray view of the map: rows of np.memmap are several times slower to index
+        bot.replay(self.trajectories[:, column:column + count].view(np.ndarray))
+        return True
+
+    def build(self, bot_farm_config: dict, steps: int) -> None:
+        """Compute steps measures of all sensors of all bots of bot_farm_config and write them to the file.
+        The file is written to a temporary file and renamed, processes which use the old file keep it"""
+        config = {key: value for key, value in bot_farm_config.items() if key != 'shard'}
+        seed = config['seed'] if 'seed' in config.keys() else None
+        tend_change_time = float(config['tend_change_time']) if 'tend_change_time' in config.keys() \
+            else TEND_CHANGE_TIME
+        arrays = {}  # sensor_name -> SensorArray
+        groups = {}  # (update_time, sensor_name) -> ([index in array], [column])
+        index = []
+        types = array('b')
+        for bot_config in iter_bot_configs(config):
+            update_time = int(bot_config['update_time']) if 'update_time' in bot_config.keys() else 300
+            index.append([bot_config['bot_name'], len(bot_config['sensors'])])
+            for sensor_config in bot_config['sensors']:
+                sensor_name, sensor_config = next(iter(sensor_config.items()))
+                if sensor_name not in arrays:
+                    arrays[sensor_name] = SensorArray(sensor_name, tend_change_time=tend_change_time)
+                key = stream_key(seed, bot_config['bot_name'], sensor_config['field']) if seed is not None else None
+                group = groups.setdefault((update_time, sensor_name), ([], []))
+                group[0].append(arrays[sensor_name].add(sensor_config, key))
+                group[1].append(len(types))
+                types.append(SENSOR_CODES[SENSORS[sensor_name]])
+        for sensor_array in arrays.values():
+            sensor_array.build(0)  # Time of the first measure of every sensor is 0
+        groups = [(update_time, arrays[sensor_name], np.array(indexes), np.array(columns))
+                  for (update_time, sensor_name), (indexes, columns) in groups.items()]
+
+        index_data = json.dumps(index).encode()
+        offset = -(-(HEADER.size + len(index_data) + len(types)) // ALIGN) * ALIGN
+        temp_file = f"{self.file_name}.{os.getpid()}.tmp"  # Farms started together may build the same file
+        with open(temp_file, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, config_digest(config), len(index_data), steps, len(types), offset))
+            f.write(index_data)
+            types.tofile(f)
+            f.truncate(offset + steps * len(types) * 8)
+        trajectories = np.memmap(temp_file, dtype='<f8', mode='r+', offset=offset, shape=(steps, len(types)))
+        for step in range(steps):
+            row = trajectories[step]
+            for update_time, sensor_array, indexes, columns in groups:
+                row[columns] = sensor_array.measure(indexes, step * update_time)
+        trajectories.flush()
+        del trajectories
+        os.replace(temp_file, self.file_name)
+
+    def prepare(self, bot_farm_config: dict, steps: int) -> None:
+        """Load trajectories of bot_farm_config, build them first if there is no file for the config"""
+        digest = config_digest(bot_farm_config)
+        if not self.load(digest, steps):
+            self.build(bot_farm_config, steps)
+            self.load(digest, steps)
+
+
+def prepare_trajectories(bot_farm_config: dict) -> TrajectoryCache:
+    """TrajectoryCache of 'trajectory' key of config: {"file_name": ..., "steps": 1000}"""
+    trajectory_config = bot_farm_config['trajectory']
+    cache = TrajectoryCache(trajectory_config['file_name'])
+    cache.prepare(bot_farm_config, int(trajectory_config['steps']) if 'steps' in trajectory_config.keys() else STEPS)
+    return cache
@@ -0,0 +1,296 @@
+import glob
+import hashlib
+import json
+import os
+import pickle
+from Bot.schedule import MODES, CATCH_UP_POLICIES, PHASES
+from Bot_farm.clock import CLOCKS
+from Bot_farm.bot_configs import bot_name_template, template_numbered, template_number
+from Bot_farm.logs import LEVELS
+from Sensors.sensors import SENSORS, TEND_NAMES
+from Sinks.sinks import SINKS, MAX_FIELDS
+
+
+COMPILER_VERSION = 2  # Change to drop cached configs compiled by an older compiler
+FARM_MODES = ('sync', 'async')
+
+# key -> type to convert value to or tuple of allowed values. dict and list values are only checked
+FARM_KEYS = {
+    'bots': list, 'bot_groups': list, 'profiles': dict, 'mode': FARM_MODES, 'workers': int, 'concurrency': int,
+    'pool_size': int, 'timeout': float, 'tend_change_time': float, 'clock': tuple(CLOCKS), 'start_time': float,
+    'duration': float, 'iterations': int, 'seed': None, 'sink': dict, 'logging': dict, 'schedule': dict,
+    'metrics': dict, 'retry': dict, 'shard': list, 'reload_interval': float, 'checkpoint': dict, 'trajectory': dict,
+    'rate_limit': dict
+}
+RETRY_KEYS = {'max_attempts': int, 'base_delay': float, 'max_delay': float, 'dead_letter_file': str}
+SCHEDULE_KEYS = {
+    'mode': MODES, 'catch_up': CATCH_UP_POLICIES, 'burst_rate': float, 'max_lag': float, 'phase': PHASES,
+    'jitter': float, 'phase_shift': float
+}
+LOGGING_KEYS = {'level': tuple(LEVELS), 'format': ('text', 'json'), 'sample_rate': float, 'file_name': str}
+RATE_LIMIT_KEYS = {'channel_interval': float, 'channel_burst': int, 'account_interval': float, 'account_burst': int}
+CHECKPOINT_KEYS = {'file_name': str, 'interval': float}
+TRAJECTORY_KEYS = {'file_name': str, 'steps': int}
+METRICS_KEYS = {'port': int, 'host': str, 'snapshot_file': str, 'snapshot_interval': float}
+SINK_KEYS = {
+    'type': tuple(SINKS), 'base_url': str, 'url': str, 'file_name': str, 'buffer_size': int, 'batch_size': int,
+    'capacity': int, 'group_by': ('channel', 'none'), 'max_delay': float, 'max_buffer': int
+}
+BOT_KEYS = {
+    'email': str, 'channel': str, 'bot_name': str, 'api_key': str, 'update_time': int, 'sensors': list,
+    'sink': dict
+}
+BOT_MANDATORY_KEYS = ('email', 'channel', 'bot_name', 'api_key', 'sensors')
+BOT_GROUP_KEYS = dict(BOT_KEYS, count=int, start=int, profile=str, api_key_file=str)
+SENSOR_KEYS = {'field': str, 'min_value': float, 'max_value': float, 'start_value': float, 'tend': TEND_NAMES}
+SENSOR_ALIASES = {'min_val': 'min_value', 'max_val': 'max_value'}  # Keys from README -> keys of Sensor
+
+
+class ConfigError(Exception):
+    """Config has errors. errors - list of all found errors"""
+
+    def __init__(self, errors: list) -> None:
+        super().__init__(f"Incorrect config file, {len(errors)} errors:\n" + '\n'.join(errors))
+        self.errors = errors
+
+
+class ConfigCompiler:
+    """Check the whole bot_farm_config in one pass and collect all errors instead of stopping at the first one.
+    Numbers written as strings ("update_time": "300") are converted to int or float.
+    """
+
+    def __init__(self) -> None:
+        self.errors = []
+
+    def error(self, path: str, message: str) -> None:
+        self.errors.append(f"{path}: {message}")
+
+    def _value(self, value, value_type, path: str):
+        """Value converted to value_type. value_type is a type or a tuple of allowed values"""
+        if value_type is None:
+            return value
+        if isinstance(value_type, tuple):
+            if value not in value_type:
+                self.error(path, f"Unknown value {value!r}. Avaliable: {list(value_type)}")
+            return value
+        if value_type in (dict, list):
+            if not isinstance(value, value_type):
+                self.error(path, f"Must be {value_type.__name__}, but now: {type(value).__name__}")
+            return value
+        if value_type is str:
+            if not isinstance(value, (str, int)) or isinstance(value, bool):
+                self.error(path, f"Must be string, but now: {type(value).__name__}")
+                return value
+            return str(value)
+        try:
+            if isinstance(value, bool):
+                raise ValueError
+            return value_type(value)
+        except (TypeError, ValueError):
+            self.error(path, f"Must be {value_type.__name__}, but now: {value!r}")
+            return value
+
+    def _section(self, section, keys: dict, path: str, mandatory_keys=()) -> dict:
+        """Copy of dict section with converted values of known keys. Unknown keys are errors"""
+        if not isinstance(section, dict):
+            self.error(path, f"Must be dict, but now: {type(section).__name__}")
+            return {}
+        for key in mandatory_keys:
+            if key not in section.keys():
+                self.error(path, f"Key '{key}' is mandatory")
+        compiled = {}
+        for key, value in section.items():
+            if key not in keys:
+                self.error(path, f"Unknown key '{key}'")
+                continue
+            compiled[key] = self._value(value, keys[key], f"{path}.{key}")
+        return compiled
+
+    def sink(self, sink_config, path: str) -> dict:
+        sink_config = self._section(sink_config, SINK_KEYS, path)
+        if sink_config.get('type') in ('file', 'csv', 'parquet') and 'file_name' not in sink_config.keys():
+            self.error(path, f"Key 'file_name' is mandatory for {sink_config['type']} sink")
+        return sink_config
+
+    def sensor(self, sensor_config, path: str) -> dict:
+        """{"temperature": {"field": "field1", ...}}"""
+        if not isinstance(sensor_config, dict) or len(sensor_config) != 1:
+            self.error(path, f"Must be dict with one key - name of sensor, but now: {sensor_config!r}")
+            return sensor_config
+        sensor_name, config = next(iter(sensor_config.items()))
+        if sensor_name not in SENSORS:
+            self.error(path, f"Unknown sensor: {sensor_name}. Avaliable: {list(SENSORS)}")
+        if isinstance(config, dict):
+            config = {SENSOR_ALIASES.get(key, key): value for key, value in config.items()}
+        config = self._section(config, SENSOR_KEYS, f"{path}.{sensor_name}", ['field'])
+        if isinstance(config.get('min_value'), float) and isinstance(config.get('max_value'), float) and \
+                config['min_value'] > config['max_value']:
+            self.error(f"{path}.{sensor_name}", "min_value is greater than max_value")
+        return {sensor_name: config}
+
+    def sensors(self, sensors_configs, path: str) -> list:
+        if not isinstance(sensors_configs, list):
+            self.error(path, f"Must be list, but now: {type(sensors_configs).__name__}")
+            return sensors_configs
+        if len(sensors_configs) > MAX_FIELDS:
+            self.error(path, f"No more than {MAX_FIELDS} sensors per bot, but now: {len(sensors_configs)}")
+        return [self.sensor(sensor_config, f"{path}[{num}]") for num, sensor_config in enumerate(sensors_configs)]
+
+    def bot(self, bot_config, path: str, keys: dict = BOT_KEYS, mandatory_keys=BOT_MANDATORY_KEYS) -> dict:
+        bot_config = self._section(bot_config, keys, path, mandatory_keys)
+        if 'sensors' in bot_config.keys():
+            bot_config['sensors'] = self.sensors(bot_config['sensors'], f"{path}.sensors")
+        if 'sink' in bot_config.keys():
+            bot_config['sink'] = self.sink(bot_config['sink'], f"{path}.sink")
+        return bot_config
+
+    def bots(self, bots_configs: list) -> list:
+        compiled = []
+        bot_names = set()
+        for num, bot_config in enumerate(bots_configs):
+            bot_config = self.bot(bot_config, f"bots[{num}]")
+            if 'bot_name' in bot_config.keys():
+                if bot_config['bot_name'] in bot_names:
+                    self.error(f"bots[{num}]", f"Duplicate bot_name: {bot_config['bot_name']}")
+                bot_names.add(bot_config['bot_name'])
+            compiled.append(bot_config)
+        return compiled
+
+    def bot_groups(self, groups: list, profiles: dict) -> list:
+        compiled = []
+        for num, group in enumerate(groups):
+            path = f"bot_groups[{num}]"
+            group = self.bot(group, path, BOT_GROUP_KEYS, ['count'])
+            if 'profile' in group.keys() and group['profile'] not in profiles:
+                self.error(path, f"Unknown profile: {group['profile']}. Avaliable: {list(profiles)}")
+            profile = profiles.get(group.get('profile'), {})
+            if 'sensors' not in group.keys() and 'sensors' not in profile.keys():
+                self.error(path, "Key 'sensors' is mandatory for group or its profile")
+            if 'api_key' not in group.keys() and 'api_key_file' not in group.keys() and 'api_key' not in profile:
+                self.error(path, "Key 'api_key' or 'api_key_file' is mandatory for group or its profile")
+            compiled.append(group)
+        return compiled
+
+    def bot_names(self, bots: list, groups: list, profiles: dict) -> None:
+        """bot_name identifies a bot in reload, checkpoint, trajectories and stats, so bots of 'bots' and of all
+        groups must have different names. Groups are checked by templates of names without building their bots"""
+        names = {}  # bot_name template -> [(first number, last number + 1, path)]
+        for num, group in enumerate(groups):
+            if not isinstance(group, dict) or not isinstance(group.get('count'), int):
+                continue
+            path = f"bot_groups[{num}].bot_name"
+            template = bot_name_template(group, profiles)
+            try:
+                numbered = template_numbered(template)
+            except ValueError as e:
+                self.error(path, f"Incorrect template {template!r}: {e}")
+                continue
+            start = group['start'] if isinstance(group.get('start'), int) else 1
+            numbers = (start, start + group['count']) if numbered else (0, 1)
+            if not numbered and group['count'] > 1:
+                self.error(path, f"Bots of group have the same name {template!r}, add {{n}} to bot_name")
+            for first, end, other_path in names.get(template, []):
+                if numbers[0] < end and first < numbers[1]:
+                    self.error(path, f"Names of bots {template!r} overlap with names of {other_path}")
+            names.setdefault(template, []).append(numbers + (path,))
+        for num, bot_config in enumerate(bots):
+            if not isinstance(bot_config, dict) or not isinstance(bot_config.get('bot_name'), str):
+                continue
+            for template, ranges in names.items():
+                n = template_number(template, bot_config['bot_name'])
+                for first, end, path in ranges:
+                    if n is not None and first <= n < end:
+                        self.error(f"bots[{num}]", f"Duplicate bot_name: {bot_config['bot_name']}, also in {path}")
+
+    def files(self, config: dict) -> None:
+        """Check files which config refers to. They can change without change of config, so the result of
+        this check is never cached"""
+        for num, group in enumerate(config.get('bot_groups', [])):
+            if isinstance(group, dict) and 'api_key_file' in group.keys() and \
+                    not os.path.isfile(group['api_key_file']):
+                self.error(f"bot_groups[{num}].api_key_file", f"No such file: {group['api_key_file']}")
+
+    def check_files(self, config: dict) -> None:
+        """Raise ConfigError if files of compiled config are missing"""
+        self.errors = []
+        self.files(config)
+        if self.errors:
+            raise ConfigError(self.errors)
+
+    def compile(self, bot_farm_config, check_files: bool = True) -> dict:
+        """Compiled copy of bot_farm_config. Raise ConfigError with all errors if there are any.
+        check_files=False - skip checks of files which config refers to, see files()"""
+        self.errors = []
+        config = self._section(bot_farm_config, FARM_KEYS, 'config')
+        if isinstance(bot_farm_config, dict) and 'bots' not in config.keys() and 'bot_groups' not in config.keys():
+            self.error('config', "Key 'bots' or 'bot_groups' is mandatory")
+        sections = {'retry': RETRY_KEYS, 'schedule': SCHEDULE_KEYS, 'logging': LOGGING_KEYS, 'metrics': METRICS_KEYS,
+                    'rate_limit': RATE_LIMIT_KEYS}
+        for key, keys in sections.items():
+            if isinstance(config.get(key), dict):
+                config[key] = self._section(config[key], keys, f"config.{key}")
+        if isinstance(config.get('checkpoint'), dict):
+            config['checkpoint'] = self._section(config['checkpoint'], CHECKPOINT_KEYS, 'config.checkpoint',
+                                                 ['file_name'])
+        if isinstance(config.get('trajectory'), dict):
+            config['trajectory'] = self._section(config['trajectory'], TRAJECTORY_KEYS, 'config.trajectory',
+                                                 ['file_name'])
+        if isinstance(config.get('sink'), dict):
+            config['sink'] = self.sink(config['sink'], 'config.sink')
+        if isinstance(config.get('bots'), list):
+            config['bots'] = self.bots(config['bots'])
+        if isinstance(config.get('profiles'), dict):
+            config['profiles'] = {name: self.bot(profile, f"profiles.{name}", BOT_KEYS, ())
+                                  for name, profile in config['profiles'].items()}
+        if isinstance(config.get('bot_groups'), list):
+            config['bot_groups'] = self.bot_groups(config['bot_groups'], config.get('profiles', {}))
+            if isinstance(config.get('profiles', {}), dict):
+                self.bot_names(config['bots'] if isinstance(config.get('bots'), list) else [], config['bot_groups'],
+                               config.get('profiles', {}))
+        if check_files and isinstance(config.get('bot_groups'), list):
+            self.files(config)
+        if self.errors:
+            raise ConfigError(self.errors)
+        return config
+
+
+def compile_config(bot_farm_config: dict, check_files: bool = True) -> dict:
+    """Check bot_farm_config and convert its values. Raise ConfigError with all errors"""
+    return ConfigCompiler().compile(bot_farm_config, check_files)
+
+
+def load_config(file_name: str, cache_dir: str = None, write_cache: bool = True) -> dict:
+    """Load and compile config file. Compiled config is cached as pickle in cache_dir (default: .cache folder
+    next to the config file) under the hash of the file, so a restart with the same file skips parsing and checks.
+    Files which config refers to are checked every time. write_cache=False - use the cache, but do not write it.
+    """
+    with open(file_name, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data + str(COMPILER_VERSION).encode()).hexdigest()[:16]
+    cache_dir = cache_dir if cache_dir is not None else os.path.join(os.path.dirname(file_name), '.cache')
+    cache_prefix = os.path.join(cache_dir, os.path.basename(file_name))
+    cache_file = f"{cache_prefix}.{digest}.pickle"
+    if os.path.isfile(cache_file):
+        try:
+            with open(cache_file, 'rb') as f:
+                config = pickle.load(f)
+        except Exception:
+            config = None  # Broken cache file is compiled again
+        if config is not None:
+            ConfigCompiler().check_files(config)
+            return config
+    config = compile_config(json.loads(data), check_files=False)
+    ConfigCompiler().check_files(config)
+    if not write_cache:
+        return config
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        for old_file in glob.glob(glob.escape(cache_prefix) + '.*.pickle'):
+            os.remove(old_file)
+        temp_file = cache_file + '.tmp'
+        with open(temp_file, 'wb') as f:
+            pickle.dump(config, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, cache_file)
+    except OSError:
+        pass  # Config works without cache, e.g. in a read only folder
+    return config
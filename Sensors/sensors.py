@@ -1,85 +1,129 @@
 import random
 import time
-
-
-TENDS = {
-    'fast_decrease',
-    'decrease',
-    'normal',
-    'increase',
-    'fast_increase'
+from collections import namedtuple
+from Sensors.streams import MASK, MULTIPLIER, INCREMENT, SCALE, TEND_STREAM, uniform
+
+
+TEND_NAMES = ('fast_decrease', 'decrease', 'normal', 'increase', 'fast_increase')
+TEND_INDEX = {tend: num for num, tend in enumerate(TEND_NAMES)}
+TENDS = set(TEND_NAMES)
+
+TEND_CHANGE_TIME = 28800  # Change tend every 8h by default
+
+SensorType = namedtuple('SensorType', ['sensor_name', 'min_value', 'max_value', 'start_value', 'precision', 'deltas'])
+
+# deltas: (low, high) range of value change for every tend in TEND_NAMES
+SENSOR_TABLE = {
+    'temperature': SensorType('Temperature', -40, 50, 25, 2,
+                              ((-1, -0.2), (-0.5, -0.1), (-0.3, 0.3), (0.1, 0.5), (0.2, 1))),
+    'humidity': SensorType('Humidity', 0, 100, 50, 2,
+                           ((-1, -0.2), (-0.5, -0.1), (-0.3, 0.3), (0.1, 0.5), (0.2, 1))),
+    'pressure': SensorType('Pressure', 90, 110, 100, 2,
+                           ((-0.5, -0.1), (-0.2, -0.05), (-0.1, 0.1), (0.05, 0.2), (0.1, 0.5))),
+    'PM2.5': SensorType('PM2.5', 0, 0.5, 0.01, 4,
+                        ((-0.02, -0.005), (-0.005, -0.001), (-0.001, 0.001), (0.001, 0.005), (0.005, 0.02))),
+    'PM10': SensorType('PM10', 0, 1, 0.01, 4,
+                       ((-0.05, -0.01), (-0.02, -0.005), (-0.01, 0.01), (0.005, 0.02), (0.01, 0.05))),
+    'CO': SensorType('CO', 0, 25, 1, 2,
+                     ((-0.5, -0.1), (-0.2, -0.05), (-0.1, 0.1), (0.05, 0.2), (0.1, 0.5))),
+    'SO2': SensorType('SO2', 0, 20, 0.1, 4,
+                      ((-0.04, -0.02), (-0.02, -0.01), (-0.01, 0.01), (0.01, 0.02), (0.02, 0.04))),
+    'NO2': SensorType('NO2', 0, 20, 0.1, 4,
+                      ((-0.04, -0.02), (-0.02, -0.01), (-0.01, 0.01), (0.01, 0.02), (0.02, 0.04))),
+    'O3': SensorType('O3', 0, 18, 0.001, 4,
+                     ((-0.004, -0.002), (-0.002, -0.001), (-0.001, 0.001), (0.001, 0.002), (0.002, 0.004))),
+    'NH3': SensorType('NH3', 0, 50, 1, 2,
+                      ((-0.4, -0.2), (-0.2, -0.1), (-0.1, 0.1), (0.1, 0.2), (0.2, 0.4))),
+    'H2S': SensorType('H2S', 0, 20, 0.5, 4,
+                      ((-0.2, -0.1), (-0.1, -0.05), (-0.05, 0.05), (0.05, 0.1), (0.1, 0.2))),
+    'CO2': SensorType('CO2', 0, 20000, 1000, 1,
+                      ((-20, -10), (-10, -5), (-5, 5), (5, 10), (10, 20)))
 }
 
 
 class Sensor:
-    """Sensor measure and send value of air parameter"""
+    """Sensor measure and send value of air parameter
+
+    Behaviour of every sensor type is described by its row in SENSOR_TABLE. Subclass sets only
+    sensor_type, everything else is precomputed from the table once per class:
+    sensor_name, default limits, rounding precision and {tend: (low, high - low)} of value change.
+
+    Tend is changed every tend_change_time by TendScheduler of the farm (Sensors.tend), measure()
+    does not check time.
+
+    stream_key: key of the own random stream of the sensor (Sensors.streams). Values of measures and tend
+    changes depend only on the key, so a sensor with the same key gives the same series in any farm.
+    If None - a random key. The next number of the stream is drawn from its state by measure() itself,
+    see Sensors.streams.skip.
+    """
 
-    def __init__(self, sensor_config: dict) -> None:
+    __slots__ = ('sensor_config', 'field', 'tend', 'set_tend_time', 'min_value', 'max_value', 'current_value',
+                 'stream_key', 'stream', 'drawn', 'tend_draws')
+
+    sensor_type = None  # Key of SENSOR_TABLE
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        row = SENSOR_TABLE[cls.sensor_type]
+        cls.sensor_name = row.sensor_name
+        cls.default_min_value = row.min_value
+        cls.default_max_value = row.max_value
+        cls.default_start_value = row.start_value
+        cls.precision = row.precision
+        cls.deltas = {tend: (low, high - low) for tend, (low, high) in zip(TEND_NAMES, row.deltas)}
+
+    def __init__(self, sensor_config: dict, stream_key: int = None) -> None:
         self.sensor_config = sensor_config
         self.check_config()
         self.field = self.sensor_config['field']
         self.tend = self._start_tend
+        self.min_value = self._config_value('min_value', self.default_min_value)
+        self.max_value = self._config_value('max_value', self.default_max_value)
+        self.current_value = self._config_value('start_value', self.default_start_value)
+        self.stream_key = stream_key if stream_key is not None else random.getrandbits(64)
+        self.stream = self.stream_key & MASK  # State of the stream of measures
+        self.drawn = 0  # Numbers drawn from the stream of measures
+        self.tend_draws = 0  # Numbers drawn from the tend stream
 
     def check_config(self):
         mandatory_keys = ['field']
 
-        assert isinstance(self.sensor_config, dict), f"Incorrect config file. Must be dict, but now:" \
-                                                     f" {type(self.sensor_config)}"
+        if not isinstance(self.sensor_config, dict):
+            raise Exception(f"Incorrect config file. Must be dict, but now: {type(self.sensor_config)}")
         for key in mandatory_keys:
-            assert key in mandatory_keys, f"Incorrect config file. Key '{key}' is mandatory"
+            if key not in self.sensor_config:
+                raise Exception(f"Incorrect config file. Key '{key}' is mandatory")
+
+    def update_config(self, sensor_config: dict) -> None:
+        """Apply changed sensor_config. Current value (clamped by new limits) and tend are kept"""
+        self.sensor_config = sensor_config
+        self.check_config()
+        self.field = self.sensor_config['field']
+        self.min_value = self._config_value('min_value', self.default_min_value)
+        self.max_value = self._config_value('max_value', self.default_max_value)
+        self.current_value = min(max(self.current_value, self.min_value), self.max_value)
+
+    def _config_value(self, key: str, default):
+        """If there is no key in config - use default value of sensor type"""
+        return float(self.sensor_config[key]) if key in self.sensor_config.keys() else default
 
     @property
     def _start_tend(self):
         self.set_tend_time = time.time()
         return self.sensor_config['tend'] if 'tend' in self.sensor_config.keys() else 'normal'
 
-    def change_tend(self):
-        self.tend = random.choice(list(TENDS - {self.tend}))
-
-
-class TemperatureSensor(Sensor):
-
-    def __init__(self, sensor_config):
-        super().__init__(sensor_config)
-        self.min_value = self._min_value
-        self.max_value = self._max_value
-        self.current_value = self._start_value
-        self.sensor_name = 'Temperature'
-
-    @property
-    def _min_value(self):
-        return int(self.sensor_config['min_value']) if 'min_value' in self.sensor_config.keys() else -40
-
-    @property
-    def _max_value(self):
-        return int(self.sensor_config['max_value']) if 'max_value' in self.sensor_config.keys() else 50
-
-    @property
-    def _start_value(self):
-        return int(self.sensor_config['start_value']) if 'start_value' in self.sensor_config.keys() else 25
-
-    @property
-    def delta_temperature(self):
-        if self.tend == 'fast_decrease':
-            return random.uniform(-1, -0.2)
-
-        if self.tend == 'decrease':
-            return random.uniform(-0.5, -0.1)
-
-        if self.tend == 'normal':
-            return random.uniform(-0.3, 0.3)
-
-        if self.tend == 'increase':
-            return random.uniform(0.1, 0.5)
-
-        if self.tend == 'fast_increase':
-            return random.uniform(0.2, 1)
+    def change_tend(self, now: float = None):
+        """Change tend to one of the other tends. Called by TendScheduler of the farm"""
+        shift = 1 + int(uniform(self.stream_key ^ TEND_STREAM, self.tend_draws) * (len(TEND_NAMES) - 1))
+        self.tend_draws += 1
+        self.tend = TEND_NAMES[(TEND_INDEX[self.tend] + shift) % len(TEND_NAMES)]
+        self.set_tend_time = now if now is not None else time.time()
 
     def measure(self):
-        if time.time() - self.set_tend_time > 28800:  # Change tend every 8h
-            self.change_tend()
-
-        new_value = round(self.current_value + self.delta_temperature, 2)
+        low, width = self.deltas[self.tend]
+        self.stream = stream = (self.stream * MULTIPLIER + INCREMENT) & MASK
+        self.drawn += 1
+        new_value = round(self.current_value + low + width * (stream * SCALE), self.precision)
         if new_value > self.max_value:
             new_value = self.max_value
         elif new_value < self.min_value:
@@ -88,577 +132,77 @@ class TemperatureSensor(Sensor):
         self.current_value = new_value
 
 
-class HumiditySensor(Sensor):
-
-    def __init__(self, sensor_config):
-        super().__init__(sensor_config)
-        self.min_value = self._min_value
-        self.max_value = self._max_value
-        self.current_value = self._start_value
-        self.sensor_name = 'Humidity'
-
-    @property
-    def _min_value(self):
-        return int(self.sensor_config['min_value']) if 'min_value' in self.sensor_config.keys() else 0
-
-    @property
-    def _max_value(self):
-        return int(self.sensor_config['max_value']) if 'max_value' in self.sensor_config.keys() else 100
-
-    @property
-    def _start_value(self):
-        return int(self.sensor_config['start_value']) if 'start_value' in self.sensor_config.keys() else 50
-
-    @property
-    def delta_humidity(self):
-        if self.tend == 'fast_decrease':
-            return random.uniform(-1, -0.2)
-
-        if self.tend == 'decrease':
-            return random.uniform(-0.5, -0.1)
-
-        if self.tend == 'normal':
-            return random.uniform(-0.3, 0.3)
-
-        if self.tend == 'increase':
-            return random.uniform(0.1, 0.5)
-
-        if self.tend == 'fast_increase':
-            return random.uniform(0.2, 1)
-
-    def measure(self):
-        if time.time() - self.set_tend_time > 28800:  # Change tend every 8h
-            self.change_tend()
+class TemperatureSensor(Sensor):
+    __slots__ = ()
+    sensor_type = 'temperature'
 
-        new_value = round(self.current_value + self.delta_humidity, 2)
-        if new_value > self.max_value:
-            new_value = self.max_value
-        elif new_value < self.min_value:
-            new_value = self.min_value
 
-        self.current_value = new_value
+class HumiditySensor(Sensor):
+    __slots__ = ()
+    sensor_type = 'humidity'
 
 
 class PressureSensor(Sensor):
-
-    def __init__(self, sensor_config):
-        super().__init__(sensor_config)
-        self.min_value = self._min_value
-        self.max_value = self._max_value
-        self.current_value = self._start_value
-        self.sensor_name = 'Pressure'
-
-    @property
-    def _min_value(self):
-        return int(self.sensor_config['min_value']) if 'min_value' in self.sensor_config.keys() else 90
-
-    @property
-    def _max_value(self):
-        return int(self.sensor_config['max_value']) if 'max_value' in self.sensor_config.keys() else 110
-
-    @property
-    def _start_value(self):
-        return int(self.sensor_config['start_value']) if 'start_value' in self.sensor_config.keys() else 100
-
-    @property
-    def delta_pressure(self):
-        if self.tend == 'fast_decrease':
-            return random.uniform(-0.5, -0.1)
-
-        if self.tend == 'decrease':
-            return random.uniform(-0.2, -0.05)
-
-        if self.tend == 'normal':
-            return random.uniform(-0.1, 0.1)
-
-        if self.tend == 'increase':
-            return random.uniform(0.05, 0.2)
-
-        if self.tend == 'fast_increase':
-            return random.uniform(0.1, 0.5)
-
-    def measure(self):
-        if time.time() - self.set_tend_time > 28800:  # Change tend every 8h
-            self.change_tend()
-
-        new_value = round(self.current_value + self.delta_pressure, 2)
-        if new_value > self.max_value:
-            new_value = self.max_value
-        elif new_value < self.min_value:
-            new_value = self.min_value
-
-        self.current_value = new_value
+    __slots__ = ()
+    sensor_type = 'pressure'
 
 
 class PM25Sensor(Sensor):
     """MPC = 0.025 mg/m3"""
-
-    def __init__(self, sensor_config):
-        super().__init__(sensor_config)
-        self.min_value = self._min_value
-        self.max_value = self._max_value
-        self.current_value = self._start_value
-        self.sensor_name = 'PM2.5'
-
-    @property
-    def _min_value(self):
-        return int(self.sensor_config['min_value']) if 'min_value' in self.sensor_config.keys() else 0
-
-    @property
-    def _max_value(self):
-        return int(self.sensor_config['max_value']) if 'max_value' in self.sensor_config.keys() else 0.5
-
-    @property
-    def _start_value(self):
-        return int(self.sensor_config['start_value']) if 'start_value' in self.sensor_config.keys() else 0.01
-
-    @property
-    def delta_pm25(self):
-        if self.tend == 'fast_decrease':
-            return random.uniform(-0.02, -0.005)
-
-        if self.tend == 'decrease':
-            return random.uniform(-0.005, -0.001)
-
-        if self.tend == 'normal':
-            return random.uniform(-0.001, 0.001)
-
-        if self.tend == 'increase':
-            return random.uniform(0.001, 0.005)
-
-        if self.tend == 'fast_increase':
-            return random.uniform(0.005, 0.02)
-
-    def measure(self):
-        if time.time() - self.set_tend_time > 28800:  # Change tend every 8h
-            self.change_tend()
-
-        new_value = round(self.current_value + self.delta_pm25, 4)
-        if new_value > self.max_value:
-            new_value = self.max_value
-        elif new_value < self.min_value:
-            new_value = self.min_value
-
-        self.current_value = new_value
+    __slots__ = ()
+    sensor_type = 'PM2.5'
 
 
 class PM10Sensor(Sensor):
     """MPC = 0.05 mg/m3"""
-
-    def __init__(self, sensor_config):
-        super().__init__(sensor_config)
-        self.min_value = self._min_value
-        self.max_value = self._max_value
-        self.current_value = self._start_value
-        self.sensor_name = 'PM10'
-
-    @property
-    def _min_value(self):
-        return int(self.sensor_config['min_value']) if 'min_value' in self.sensor_config.keys() else 0
-
-    @property
-    def _max_value(self):
-        return int(self.sensor_config['max_value']) if 'max_value' in self.sensor_config.keys() else 1
-
-    @property
-    def _start_value(self):
-        return int(self.sensor_config['start_value']) if 'start_value' in self.sensor_config.keys() else 0.01
-
-    @property
-    def delta_pm10(self):
-        if self.tend == 'fast_decrease':
-            return random.uniform(-0.05, -0.01)
-
-        if self.tend == 'decrease':
-            return random.uniform(-0.02, -0.005)
-
-        if self.tend == 'normal':
-            return random.uniform(-0.01, 0.01)
-
-        if self.tend == 'increase':
-            return random.uniform(0.005, 0.02)
-
-        if self.tend == 'fast_increase':
-            return random.uniform(0.01, 0.05)
-
-    def measure(self):
-        if time.time() - self.set_tend_time > 28800:  # Change tend every 8h
-            self.change_tend()
-
-        new_value = round(self.current_value + self.delta_pm10, 4)
-        if new_value > self.max_value:
-            new_value = self.max_value
-        elif new_value < self.min_value:
-            new_value = self.min_value
-
-        self.current_value = new_value
+    __slots__ = ()
+    sensor_type = 'PM10'
 
 
 class COSensor(Sensor):
     """MPC = 17.5 ppm
     1 ppm = 1.16197 mg/m3"""
-
-    def __init__(self, sensor_config):
-        super().__init__(sensor_config)
-        self.min_value = self._min_value
-        self.max_value = self._max_value
-        self.current_value = self._start_value
-        self.sensor_name = 'CO'
-
-    @property
-    def _min_value(self):
-        return int(self.sensor_config['min_value']) if 'min_value' in self.sensor_config.keys() else 0
-
-    @property
-    def _max_value(self):
-        return int(self.sensor_config['max_value']) if 'max_value' in self.sensor_config.keys() else 25
-
-    @property
-    def _start_value(self):
-        return int(self.sensor_config['start_value']) if 'start_value' in self.sensor_config.keys() else 1
-
-    @property
-    def delta_CO(self):
-        if self.tend == 'fast_decrease':
-            return random.uniform(-0.5, -0.1)
-
-        if self.tend == 'decrease':
-            return random.uniform(-0.2, -0.05)
-
-        if self.tend == 'normal':
-            return random.uniform(-0.1, 0.1)
-
-        if self.tend == 'increase':
-            return random.uniform(0.05, 0.2)
-
-        if self.tend == 'fast_increase':
-            return random.uniform(0.1, 0.5)
-
-    def measure(self):
-        if time.time() - self.set_tend_time > 28800:  # Change tend every 8h
-            self.change_tend()
-
-        new_value = round(self.current_value + self.delta_CO, 2)
-        if new_value > self.max_value:
-            new_value = self.max_value
-        elif new_value < self.min_value:
-            new_value = self.min_value
-
-        self.current_value = new_value
+    __slots__ = ()
+    sensor_type = 'CO'
 
 
 class SO2Sensor(Sensor):
     """MPC = 3.8 ppm
     1 ppm = 2.65722 mg/m3"""
-
-    def __init__(self, sensor_config):
-        super().__init__(sensor_config)
-        self.min_value = self._min_value
-        self.max_value = self._max_value
-        self.current_value = self._start_value
-        self.sensor_name = 'SO2'
-
-    @property
-    def _min_value(self):
-        return int(self.sensor_config['min_value']) if 'min_value' in self.sensor_config.keys() else 0
-
-    @property
-    def _max_value(self):
-        return int(self.sensor_config['max_value']) if 'max_value' in self.sensor_config.keys() else 20
-
-    @property
-    def _start_value(self):
-        return int(self.sensor_config['start_value']) if 'start_value' in self.sensor_config.keys() else 0.1
-
-    @property
-    def delta_SO2(self):
-        if self.tend == 'fast_decrease':
-            return random.uniform(-0.04, -0.02)
-
-        if self.tend == 'decrease':
-            return random.uniform(-0.02, -0.01)
-
-        if self.tend == 'normal':
-            return random.uniform(-0.01, 0.01)
-
-        if self.tend == 'increase':
-            return random.uniform(0.01, 0.02)
-
-        if self.tend == 'fast_increase':
-            return random.uniform(0.02, 0.04)
-
-    def measure(self):
-        if time.time() - self.set_tend_time > 28800:  # Change tend every 8h
-            self.change_tend()
-
-        new_value = round(self.current_value + self.delta_SO2, 4)
-        if new_value > self.max_value:
-            new_value = self.max_value
-        elif new_value < self.min_value:
-            new_value = self.min_value
-
-        self.current_value = new_value
+    __slots__ = ()
+    sensor_type = 'SO2'
 
 
 class NO2Sensor(Sensor):
     """MPC = 1.6 ppm
     1 ppm = 1.9085 mg/m3"""
-
-    def __init__(self, sensor_config):
-        super().__init__(sensor_config)
-        self.min_value = self._min_value
-        self.max_value = self._max_value
-        self.current_value = self._start_value
-        self.sensor_name = 'NO2'
-
-    @property
-    def _min_value(self):
-        return int(self.sensor_config['min_value']) if 'min_value' in self.sensor_config.keys() else 0
-
-    @property
-    def _max_value(self):
-        return int(self.sensor_config['max_value']) if 'max_value' in self.sensor_config.keys() else 20
-
-    @property
-    def _start_value(self):
-        return int(self.sensor_config['start_value']) if 'start_value' in self.sensor_config.keys() else 0.1
-
-    @property
-    def delta_NO2(self):
-        if self.tend == 'fast_decrease':
-            return random.uniform(-0.04, -0.02)
-
-        if self.tend == 'decrease':
-            return random.uniform(-0.02, -0.01)
-
-        if self.tend == 'normal':
-            return random.uniform(-0.01, 0.01)
-
-        if self.tend == 'increase':
-            return random.uniform(0.01, 0.02)
-
-        if self.tend == 'fast_increase':
-            return random.uniform(0.02, 0.04)
-
-    def measure(self):
-        if time.time() - self.set_tend_time > 28800:  # Change tend every 8h
-            self.change_tend()
-
-        new_value = round(self.current_value + self.delta_NO2, 4)
-        if new_value > self.max_value:
-            new_value = self.max_value
-        elif new_value < self.min_value:
-            new_value = self.min_value
-
-        self.current_value = new_value
+    __slots__ = ()
+    sensor_type = 'NO2'
 
 
 class O3Sensor(Sensor):
     """MPC = 0.05 ppm
     1 ppm = 1.99116 mg/m3"""
-    def __init__(self, sensor_config):
-        super().__init__(sensor_config)
-        self.min_value = self._min_value
-        self.max_value = self._max_value
-        self.current_value = self._start_value
-        self.sensor_name = 'O3'
-
-    @property
-    def _min_value(self):
-        return int(self.sensor_config['min_value']) if 'min_value' in self.sensor_config.keys() else 0
-
-    @property
-    def _max_value(self):
-        return int(self.sensor_config['max_value']) if 'max_value' in self.sensor_config.keys() else 18
-
-    @property
-    def _start_value(self):
-        return int(self.sensor_config['start_value']) if 'start_value' in self.sensor_config.keys() else 0.001
-
-    @property
-    def delta_O3(self):
-        if self.tend == 'fast_decrease':
-            return random.uniform(-0.004, -0.002)
-
-        if self.tend == 'decrease':
-            return random.uniform(-0.002, -0.001)
-
-        if self.tend == 'normal':
-            return random.uniform(-0.001, 0.001)
-
-        if self.tend == 'increase':
-            return random.uniform(0.001, 0.002)
-
-        if self.tend == 'fast_increase':
-            return random.uniform(0.002, 0.004)
-
-    def measure(self):
-        if time.time() - self.set_tend_time > 28800:  # Change tend every 8h
-            self.change_tend()
-
-        new_value = round(self.current_value + self.delta_O3, 4)
-        if new_value > self.max_value:
-            new_value = self.max_value
-        elif new_value < self.min_value:
-            new_value = self.min_value
-
-        self.current_value = new_value
+    __slots__ = ()
+    sensor_type = 'O3'
 
 
 class NH3Sensor(Sensor):
     """MPC = 28.2 ppm"""
-
-    def __init__(self, sensor_config):
-        super().__init__(sensor_config)
-        self.min_value = self._min_value
-        self.max_value = self._max_value
-        self.current_value = self._start_value
-        self.sensor_name = 'NH3'
-
-    @property
-    def _min_value(self):
-        return int(self.sensor_config['min_value']) if 'min_value' in self.sensor_config.keys() else 0
-
-    @property
-    def _max_value(self):
-        return int(self.sensor_config['max_value']) if 'max_value' in self.sensor_config.keys() else 50
-
-    @property
-    def _start_value(self):
-        return int(self.sensor_config['start_value']) if 'start_value' in self.sensor_config.keys() else 1
-
-    @property
-    def delta_NH3(self):
-        if self.tend == 'fast_decrease':
-            return random.uniform(-0.4, -0.2)
-
-        if self.tend == 'decrease':
-            return random.uniform(-0.2, -0.1)
-
-        if self.tend == 'normal':
-            return random.uniform(-0.1, 0.1)
-
-        if self.tend == 'increase':
-            return random.uniform(0.1, 0.2)
-
-        if self.tend == 'fast_increase':
-            return random.uniform(0.2, 0.4)
-
-    def measure(self):
-        if time.time() - self.set_tend_time > 28800:  # Change tend every 8h
-            self.change_tend()
-
-        new_value = round(self.current_value + self.delta_NH3, 2)
-        if new_value > self.max_value:
-            new_value = self.max_value
-        elif new_value < self.min_value:
-            new_value = self.min_value
-
-        self.current_value = new_value
+    __slots__ = ()
+    sensor_type = 'NH3'
 
 
 class H2SSensor(Sensor):
     """MPC = 7.2 ppm"""
-
-    def __init__(self, sensor_config):
-        super().__init__(sensor_config)
-        self.min_value = self._min_value
-        self.max_value = self._max_value
-        self.current_value = self._start_value
-        self.sensor_name = 'H2S'
-
-    @property
-    def _min_value(self):
-        return int(self.sensor_config['min_value']) if 'min_value' in self.sensor_config.keys() else 0
-
-    @property
-    def _max_value(self):
-        return int(self.sensor_config['max_value']) if 'max_value' in self.sensor_config.keys() else 20
-
-    @property
-    def _start_value(self):
-        return int(self.sensor_config['start_value']) if 'start_value' in self.sensor_config.keys() else 0.5
-
-    @property
-    def delta_H2S(self):
-        if self.tend == 'fast_decrease':
-            return random.uniform(-0.2, -0.1)
-
-        if self.tend == 'decrease':
-            return random.uniform(-0.1, -0.05)
-
-        if self.tend == 'normal':
-            return random.uniform(-0.05, 0.05)
-
-        if self.tend == 'increase':
-            return random.uniform(0.05, 0.1)
-
-        if self.tend == 'fast_increase':
-            return random.uniform(0.1, 0.2)
-
-    def measure(self):
-        if time.time() - self.set_tend_time > 28800:  # Change tend every 8h
-            self.change_tend()
-
-        new_value = round(self.current_value + self.delta_H2S, 4)
-        if new_value > self.max_value:
-            new_value = self.max_value
-        elif new_value < self.min_value:
-            new_value = self.min_value
-
-        self.current_value = new_value
+    __slots__ = ()
+    sensor_type = 'H2S'
 
 
 class CO2Sensor(Sensor):
     """MPC = 5000 ppm"""
-
-    def __init__(self, sensor_config):
-        super().__init__(sensor_config)
-        self.min_value = self._min_value
-        self.max_value = self._max_value
-        self.current_value = self._start_value
-        self.sensor_name = 'CO2'
-
-    @property
-    def _min_value(self):
-        return int(self.sensor_config['min_value']) if 'min_value' in self.sensor_config.keys() else 0
-
-    @property
-    def _max_value(self):
-        return int(self.sensor_config['max_value']) if 'max_value' in self.sensor_config.keys() else 20000
-
-    @property
-    def _start_value(self):
-        return int(self.sensor_config['start_value']) if 'start_value' in self.sensor_config.keys() else 1000
-
-    @property
-    def delta_H2S(self):
-        if self.tend == 'fast_decrease':
-            return random.uniform(-20, -10)
-
-        if self.tend == 'decrease':
-            return random.uniform(-10, -5)
-
-        if self.tend == 'normal':
-            return random.uniform(-5, 5)
-
-        if self.tend == 'increase':
-            return random.uniform(5, 10)
-
-        if self.tend == 'fast_increase':
-            return random.uniform(10, 20)
-
-    def measure(self):
-        if time.time() - self.set_tend_time > 28800:  # Change tend every 8h
-            self.change_tend()
-
-        new_value = round(self.current_value + self.delta_H2S, 1)
-        if new_value > self.max_value:
-            new_value = self.max_value
-        elif new_value < self.min_value:
-            new_value = self.min_value
-
-        self.current_value = new_value
+    __slots__ = ()
+    sensor_type = 'CO2'
 
 
 SENSORS = {
@@ -0,0 +1,82 @@
+import hashlib
+import numpy as np
+
+
+MULTIPLIER = 0x5deece66d  # Multiplier of drand48
+INCREMENT = 11
+MASK = (1 << 53) - 1  # 53-bit state is exactly a double in [0, 1) after scaling
+SCALE = 1.0 / (1 << 53)
+TEND_STREAM = 0x5bd1e9955bd1e995  # Key of tend stream of a sensor is its stream_key ^ TEND_STREAM
+
+_MULTIPLIER = np.uint64(MULTIPLIER)
+_INCREMENT = np.uint64(INCREMENT)
+_MASK = np.uint64(MASK)
+
+
+def stream_key(seed, *identity) -> int:
+    """64-bit key of the random stream of seed and identity, e.g. (bot_name, field) of a sensor"""
+    data = repr((seed,) + identity).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+def skip(state: int, count: int) -> int:
+    """State of a stream count steps after state, in O(log count) steps.
+
+    A stream is LCG modulo 2 ** 53: state = state * MULTIPLIER + INCREMENT, the first state is the key of
+    the stream masked to 53 bits. Number n of the stream is its state after n + 1 steps scaled to [0, 1).
+    The next number costs one multiply of small ints, so Sensor.measure() draws it in pure Python without
+    blocks of numbers, and any number of a stream is found from its key and counter.
+    """
+    state &= MASK
+    multiplier, increment = MULTIPLIER, INCREMENT
+    while count:
+        if count & 1:
+            state = (state * multiplier + increment) & MASK
+        increment = ((multiplier + 1) * increment) & MASK
+        multiplier = (multiplier * multiplier) & MASK
+        count >>= 1
+    return state
+
+
+def uniform(key: int, counter: int) -> float:
+    """Number counter of the stream with key"""
+    return skip(key, counter + 1) * SCALE
+
+
+def skips(states: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """skip() for arrays of states and counts (uint64). Products overflow uint64 and wrap modulo 2 ** 64,
+    which keeps them right modulo 2 ** 53"""
+    states, counts = states & _MASK, counts.copy()
+    multiplier, increment = _MULTIPLIER, _INCREMENT
+    with np.errstate(over='ignore'):
+        while counts.any():
+            odd = (counts & np.uint64(1)).astype(bool)
+            states[odd] = (states[odd] * multiplier + increment) & _MASK
+            increment = ((multiplier + np.uint64(1)) * increment) & _MASK
+            multiplier = (multiplier * multiplier) & _MASK
+            counts >>= np.uint64(1)
+    return states
+
+
+def step(states: np.ndarray) -> np.ndarray:
+    """Advance states (uint64 array) in place by one step and return their numbers"""
+    states *= _MULTIPLIER
+    states += _INCREMENT
+    states &= _MASK
+    return states * SCALE
+
+
+def uniforms(keys: np.ndarray, counters: np.ndarray) -> np.ndarray:
+    """Numbers counters of streams with keys (uint64 arrays)"""
+    return skips(keys, counters + np.uint64(1)) * SCALE
+
+
+def seek(sensor, drawn: int) -> None:
+    """Move the stream of measures of the sensor to number drawn"""
+    sensor.stream = skip(sensor.stream_key, drawn)
+    sensor.drawn = drawn
+
+
+def used(sensor) -> int:
+    """Number of random numbers used by measures of the sensor"""
+    return sensor.drawn
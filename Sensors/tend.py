@@ -0,0 +1,54 @@
+import heapq
+import itertools
+import time
+from Sensors.sensors import TEND_CHANGE_TIME
+
+
+class TendScheduler:
+    """Change tend of sensors whose tend_change_time window expired.
+
+    One scheduler serves all sensors of a farm. tick() reads the clock once and changes tend of all
+    expired sensors in one batch, so sensors do not check time on every measure.
+
+    Entry in heap: [change_time, sequence_num, sensor]
+    """
+
+    def __init__(self, tend_change_time: float = TEND_CHANGE_TIME) -> None:
+        self.tend_change_time = tend_change_time
+        self._heap = []
+        self._entries = {}  # id(sensor) -> heap entry
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, sensor) -> None:
+        """Schedule tend change of the sensor tend_change_time after its last tend change"""
+        if id(sensor) in self._entries:
+            self.remove(sensor)
+        entry = [sensor.set_tend_time + self.tend_change_time, next(self._counter), sensor]
+        self._entries[id(sensor)] = entry
+        heapq.heappush(self._heap, entry)
+
+    def remove(self, sensor) -> None:
+        """Stop tend changes of the sensor. The heap entry is only marked as removed"""
+        entry = self._entries.pop(id(sensor))
+        entry[-1] = None
+
+    def tick(self, now: float = None) -> int:
+        """Change tend of all expired sensors. Return number of changed sensors"""
+        if now is None:
+            now = time.time()
+        changed = 0
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            entry = heapq.heappop(heap)
+            sensor = entry[-1]
+            if sensor is None:
+                continue
+            sensor.change_tend(now)
+            entry = [now + self.tend_change_time, next(self._counter), sensor]
+            self._entries[id(sensor)] = entry
+            heapq.heappush(heap, entry)
+            changed += 1
+        return changed
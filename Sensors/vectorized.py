@@ -0,0 +1,159 @@
+import time
+import numpy as np
+from Bot_farm.bot_configs import iter_bot_configs
+from Sensors.sensors import SENSOR_TABLE, TEND_NAMES, TEND_INDEX, TEND_CHANGE_TIME
+from Sensors.streams import MASK, TEND_STREAM, stream_key, step, uniforms
+
+
+class SensorArray:
+    """All sensors of one type stored as arrays and measured in one vectorized step.
+
+    Every measure gives the same distribution of values as measure() of the sensor classes in
+    Sensors.sensors: value changes by uniform delta from the range of current tend, is rounded to the
+    precision of sensor type and clamped by min and max value. Tend changes every tend_change_time
+    to one of the other tends. Expired sensors are found once per measure for the whole array.
+
+    Every sensor draws from its own random stream (Sensors.streams) like the sensor classes, so a sensor
+    with the same stream_key gives the same series here and in a bot. rng gives keys of sensors added without key.
+    """
+
+    def __init__(self, sensor_name: str, rng: np.random.Generator = None,
+                 tend_change_time: float = TEND_CHANGE_TIME) -> None:
+        if sensor_name not in SENSOR_TABLE:
+            raise ValueError(f"Unknown sensor: {sensor_name}")
+        self.sensor_name = sensor_name
+        row = SENSOR_TABLE[sensor_name]
+        self.default_min, self.default_max, self.default_start = row.min_value, row.max_value, row.start_value
+        self.precision = row.precision
+        self.delta_low = np.array([low for low, high in row.deltas])
+        self.delta_width = np.array([high - low for low, high in row.deltas])
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.tend_change_time = tend_change_time
+        self.size = 0
+        self._configs = []
+        self.current_value = np.empty(0)
+        self.min_value = np.empty(0)
+        self.max_value = np.empty(0)
+        self.tend = np.empty(0, dtype=np.int8)
+        self.set_tend_time = np.empty(0)
+        self.stream_key = np.empty(0, dtype=np.uint64)
+        self.stream = np.empty(0, dtype=np.uint64)  # State of the stream of every sensor
+        self.tend_drawn = np.empty(0, dtype=np.uint64)
+        self._stream_keys = []
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, sensor_config: dict, stream_key: int = None) -> int:
+        """Add sensor with config to the array. Return index of the sensor.
+        Sensors are collected and turned into arrays on the next measure()"""
+        self._configs.append(sensor_config)
+        if stream_key is None:
+            stream_key = int(self.rng.integers(1 << 64, dtype=np.uint64))
+        self._stream_keys.append(stream_key)
+        self.size += 1
+        return self.size - 1
+
+    def _value(self, sensor_config: dict, key: str, default: float) -> float:
+        return float(sensor_config[key]) if key in sensor_config.keys() else default
+
+    def build(self, now: float = None) -> None:
+        """Append collected sensor configs to arrays. now - start of tend of new sensors (default - current time)"""
+        configs = self._configs
+        self._configs = []
+        stream_keys = np.array(self._stream_keys, dtype=np.uint64)
+        self._stream_keys = []
+        if now is None:
+            now = time.time()
+        self.current_value = np.concatenate(
+            [self.current_value, [self._value(conf, 'start_value', self.default_start) for conf in configs]])
+        self.min_value = np.concatenate(
+            [self.min_value, [self._value(conf, 'min_value', self.default_min) for conf in configs]])
+        self.max_value = np.concatenate(
+            [self.max_value, [self._value(conf, 'max_value', self.default_max) for conf in configs]])
+        self.tend = np.concatenate(
+            [self.tend, np.array([TEND_INDEX[conf.get('tend', 'normal')] for conf in configs], dtype=np.int8)])
+        self.set_tend_time = np.concatenate([self.set_tend_time, np.full(len(configs), now)])
+        self.stream_key = np.concatenate([self.stream_key, stream_keys])
+        self.stream = np.concatenate([self.stream, stream_keys & np.uint64(MASK)])
+        self.tend_drawn = np.concatenate([self.tend_drawn, np.zeros(len(configs), dtype=np.uint64)])
+
+    def value(self, index: int) -> float:
+        if self._configs:
+            self.build()
+        return float(self.current_value[index])
+
+    def change_tend(self, index: np.ndarray, now: float) -> None:
+        """Change tend of sensors with index to one of the other tends"""
+        drawn = self.tend_drawn[index]
+        shift = 1 + (uniforms(self.stream_key[index] ^ np.uint64(TEND_STREAM), drawn) *
+                     (len(TEND_NAMES) - 1)).astype(np.int8)
+        self.tend_drawn[index] = drawn + np.uint64(1)
+        self.tend[index] = (self.tend[index] + shift) % len(TEND_NAMES)
+        self.set_tend_time[index] = now
+
+    def measure(self, index: np.ndarray = None, now: float = None) -> np.ndarray:
+        """Measure sensors with index (all sensors if index is None). Return new values"""
+        if self._configs:
+            self.build()
+        if now is None:
+            now = time.time()
+        if index is None:
+            index = slice(None)  # Basic slicing of whole arrays is faster than fancy indexing
+
+        expired = np.flatnonzero(now - self.set_tend_time[index] >= self.tend_change_time)  # Like TendScheduler
+        if len(expired):
+            self.change_tend(expired if isinstance(index, slice) else index[expired], now)
+
+        tend = self.tend[index]
+        stream = self.stream[index]
+        # The same order of operations as Sensor.measure() for equal values
+        new_value = np.round(self.current_value[index] + self.delta_low[tend] +
+                             self.delta_width[tend] * step(stream), self.precision)
+        self.stream[index] = stream  # stream is a view of self.stream for slice index
+        np.clip(new_value, self.min_value[index], self.max_value[index], out=new_value)
+        self.current_value[index] = new_value
+        return new_value
+
+
+class VectorizedEngine:
+    """Sensors of a whole farm grouped by type into SensorArray"""
+
+    def __init__(self, seed: int = None, tend_change_time: float = TEND_CHANGE_TIME) -> None:
+        self.rng = np.random.default_rng(seed)
+        self.tend_change_time = tend_change_time
+        self.arrays = {}  # sensor_name -> SensorArray
+
+    def add(self, sensor_name: str, sensor_config: dict, stream_key: int = None) -> tuple:
+        """Add sensor to the engine. Return (sensor_name, index) to read its value"""
+        if sensor_name not in self.arrays:
+            self.arrays[sensor_name] = SensorArray(sensor_name, self.rng, self.tend_change_time)
+        return sensor_name, self.arrays[sensor_name].add(sensor_config, stream_key)
+
+    @classmethod
+    def from_bot_farm_config(cls, bot_farm_config: dict, seed: int = None) -> 'VectorizedEngine':
+        """Create engine with all sensors of all bots in bot_farm_config. Sensors get the same random streams
+        as in a bot farm with seed ('seed' key of config if seed is None)"""
+        if seed is None and 'seed' in bot_farm_config.keys():
+            seed = bot_farm_config['seed']
+        tend_change_time = float(bot_farm_config['tend_change_time']) \
+            if 'tend_change_time' in bot_farm_config.keys() else TEND_CHANGE_TIME
+        engine = cls(seed if isinstance(seed, int) else None, tend_change_time)
+        for bot_config in iter_bot_configs(bot_farm_config):
+            for sensor_config in bot_config['sensors']:
+                for sensor_name, config in sensor_config.items():
+                    key = stream_key(seed, bot_config['bot_name'], config['field']) if seed is not None else None
+                    engine.add(sensor_name, config, key)
+        return engine
+
+    def value(self, sensor_name: str, index: int) -> float:
+        return self.arrays[sensor_name].value(index)
+
+    def tick(self, due: dict = None, now: float = None) -> None:
+        """Measure due sensors: {sensor_name: index_array}. Measure all sensors if due is None"""
+        if now is None:
+            now = time.time()
+        if due is None:
+            due = {sensor_name: None for sensor_name in self.arrays.keys()}
+        for sensor_name, index in due.items():
+            self.arrays[sensor_name].measure(index, now)
@@ -0,0 +1,417 @@
+import csv
+import json
+import time
+from collections import deque
+
+
+THINGSPEAK_URL = 'https://api.thingspeak.com'
+MAX_FIELDS = 8  # Max number of sensors per bot
+THROTTLE_DELAY = 15  # Seconds to wait after a throttled send if server did not say how long
+
+# Classes of server responses to a send
+ACCEPTED = 'accepted'
+THROTTLED = 'throttled'  # Rate limit of server: HTTP 429 or "0" instead of entry id from thingspeak
+AUTH_ERROR = 'auth_error'  # Wrong api key: HTTP 401, 403
+CLIENT_ERROR = 'client_error'  # Other HTTP 4xx, the same request will fail again
+SERVER_ERROR = 'server_error'  # HTTP 5xx or no response
+FINAL_RESULTS = (AUTH_ERROR, CLIENT_ERROR)  # Sends which are not retried
+
+FIELDS = [f'field{num + 1}' for num in range(MAX_FIELDS)]
+COLUMNS = ['created_at', 'channel', 'bot_name'] + FIELDS
+
+
+def reading(bot, pending) -> dict:
+    """Values of one send as {"created_at": ..., "channel": ..., "bot_name": ..., "field1": ..., ...}.
+    Values are under fields of sensors configs of the bot"""
+    row = {'created_at': pending.created_time, 'channel': bot.channel, 'bot_name': bot.bot_name}
+    row.update(zip(bot.url_encoder.fields_of(pending.values), pending.values))
+    return row
+
+
+class SendError(Exception):
+    """Server did not accept values. result - class of the response, retry_after - seconds the server asked
+    to wait before the next send or None"""
+
+    def __init__(self, result: str, status: int, retry_after: float = None) -> None:
+        super().__init__(f"{result}: HTTP {status}")
+        self.result = result
+        self.status = status
+        self.retry_after = retry_after
+
+
+def classify_response(status: int, body: bytes) -> str:
+    """Class of response to update request. Thingspeak answers a rejected update with 200 and body "0"
+    instead of id of the new entry"""
+    if status == 429:
+        return THROTTLED
+    if status in (401, 403):
+        return AUTH_ERROR
+    if status >= 500:
+        return SERVER_ERROR
+    if status >= 400:
+        return CLIENT_ERROR
+    if body.strip() == b'0':
+        return THROTTLED
+    return ACCEPTED
+
+
+def check_response(status: int, body: bytes, retry_after: str = None) -> None:
+    """Raise SendError if response with status, body and Retry-After header is not accepted"""
+    result = classify_response(status, body)
+    if result == ACCEPTED:
+        return
+    try:
+        delay = float(retry_after) if retry_after is not None else None
+    except ValueError:
+        delay = None  # Retry-After as HTTP date is not used by update APIs
+    if result == THROTTLED and delay is None:
+        delay = THROTTLE_DELAY
+    raise SendError(result, status, delay)
+
+
+class Sink:
+    """Sink receives measured values of bots. send() raises an exception if values were not delivered.
+
+    A sink with delivers_later=True only collects values in send() and delivers them later: it counts
+    every delivered value with bot.record_sent() and every failed attempt with bot.record_failed().
+    A sink with blocking=True waits for the network in send(), the async farm calls it in a thread.
+    The farm calls poll() at due_time() to deliver collected values which waited long enough"""
+
+    delivers_later = False
+    blocking = False
+
+    def send(self, bot, pending) -> None:
+        raise NotImplementedError
+
+    def due_time(self) -> float:
+        """Time when collected values are due to be delivered by poll(), None if no values wait"""
+        return None
+
+    def poll(self, now: float) -> None:
+        """Deliver collected values which are due at time now"""
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class HttpSink(Sink):
+    """Send values to update API of a server with base_url (thingspeak by default), one request per send.
+    Responses are checked, a send which was not accepted raises SendError"""
+
+    blocking = True
+
+    def __init__(self, session, base_url: str = THINGSPEAK_URL) -> None:
+        self.session = session
+        self.base_url = base_url
+
+    @classmethod
+    def from_config(cls, sink_config: dict, session) -> 'HttpSink':
+        return cls(session, sink_config['base_url'] if 'base_url' in sink_config.keys() else THINGSPEAK_URL)
+
+    def send(self, bot, pending) -> None:
+        response = self.session.get(bot.update_url(pending.values, self.base_url))
+        check_response(response.status_code, response.content, response.headers.get('Retry-After'))
+
+
+class FileSink(Sink):
+    """Append values to a file as json lines: {"created_at": ..., "channel": ..., "field1": ..., ...}
+
+    Lines are buffered and written to the file by blocks of buffer_size bytes.
+    """
+
+    def __init__(self, file_name: str, buffer_size: int = 1 << 20) -> None:
+        self.file_name = file_name
+        self.file = open(file_name, 'a', buffering=buffer_size)
+
+    @classmethod
+    def from_config(cls, sink_config: dict, session) -> 'FileSink':
+        if 'file_name' not in sink_config.keys():
+            raise ValueError("Incorrect sink config. Key 'file_name' is mandatory for file sink")
+        if 'buffer_size' in sink_config.keys():
+            return cls(sink_config['file_name'], int(sink_config['buffer_size']))
+        return cls(sink_config['file_name'])
+
+    def send(self, bot, pending) -> None:
+        self.file.write(json.dumps(reading(bot, pending)) + '\n')
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ColumnarSink(Sink):
+    """Collect values into batches of batch_size rows and write every batch at once.
+
+    file_format="csv" - batches are appended to a csv file with COLUMNS header
+    file_format="parquet" - every batch is a row group of a parquet file (needs pyarrow)
+    """
+
+    def __init__(self, file_name: str, file_format: str = 'csv', batch_size: int = 10000) -> None:
+        if file_format not in ('csv', 'parquet'):
+            raise ValueError(f"Incorrect sink config. Unknown format: {file_format}")
+        self.file_name = file_name
+        self.file_format = file_format
+        self.batch_size = batch_size
+        self.columns = {column: [] for column in COLUMNS}
+        self.size = 0
+        self._writer = None
+        if file_format == 'parquet':
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise Exception("Parquet sink needs pyarrow: pip install pyarrow")
+            self._pyarrow = pyarrow
+            self._parquet = pyarrow.parquet
+            self._schema = pyarrow.schema(
+                [('created_at', pyarrow.float64()), ('channel', pyarrow.string()), ('bot_name', pyarrow.string())] +
+                [(column, pyarrow.float64()) for column in FIELDS])
+
+    @classmethod
+    def from_config(cls, sink_config: dict, session) -> 'ColumnarSink':
+        if 'file_name' not in sink_config.keys():
+            raise ValueError("Incorrect sink config. Key 'file_name' is mandatory for csv sink")
+        file_format = sink_config['type']
+        if 'batch_size' in sink_config.keys():
+            return cls(sink_config['file_name'], file_format, int(sink_config['batch_size']))
+        return cls(sink_config['file_name'], file_format)
+
+    def send(self, bot, pending) -> None:
+        columns = self.columns
+        columns['created_at'].append(pending.created_time)
+        columns['channel'].append(str(bot.channel))
+        columns['bot_name'].append(str(bot.bot_name))
+        values = dict(zip(bot.url_encoder.fields_of(pending.values), pending.values))
+        for field in FIELDS:
+            columns[field].append(values.get(field))
+        self.size += 1
+        if self.size >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write collected batch to the file"""
+        if not self.size:
+            return
+        if self.file_format == 'csv':
+            self._write_csv()
+        else:
+            self._write_parquet()
+        self.columns = {column: [] for column in COLUMNS}
+        self.size = 0
+
+    def _write_csv(self) -> None:
+        with open(self.file_name, 'a', newline='') as f:
+            writer = csv.writer(f)
+            if f.tell() == 0:
+                writer.writerow(COLUMNS)
+            writer.writerows(zip(*(self.columns[column] for column in COLUMNS)))
+
+    def _write_parquet(self) -> None:
+        table = self._pyarrow.table(self.columns, schema=self._schema)
+        if self._writer is None:
+            self._writer = self._parquet.ParquetWriter(self.file_name, self._schema)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+
+
+class RingSink(Sink):
+    """Keep the last capacity values in memory. For benchmarks of generation without any output cost"""
+
+    def __init__(self, capacity: int = 10000) -> None:
+        self.ring = deque(maxlen=capacity)
+        self.count = 0
+
+    @classmethod
+    def from_config(cls, sink_config: dict, session) -> 'RingSink':
+        return cls(int(sink_config['capacity']) if 'capacity' in sink_config.keys() else 10000)
+
+    def send(self, bot, pending) -> None:
+        self.ring.append((bot, pending))
+        self.count += 1
+
+    def readings(self) -> list:
+        return [reading(bot, pending) for bot, pending in self.ring]
+
+
+class BulkSink(Sink):
+    """Collect values of many bots and timestamps and send them as bulk json POST requests
+    in the style of thingspeak bulk-update API.
+
+    group_by="channel" - one request per channel, as thingspeak expects:
+        POST url.format(channel=channel): {"write_api_key": api_key, "updates": [{"created_at": ..., "field1": ...}]}
+    group_by="none" - one request for all bots, every update contains its channel and api key:
+        POST url: {"updates": [{"channel": ..., "write_api_key": ..., "created_at": ..., "field1": ...}, ...]}
+
+    Buffer is flushed when batch_size values are collected or the oldest value waits for max_delay
+    seconds, the farm checks the delay with poll() between sends. Responses are checked like responses of
+    HttpSink, values count as sent for their bots only when their request is accepted. If a request fails,
+    every value of it counts as a failed (or throttled) attempt of its bot and stays in buffer to be sent
+    with the next flush, not earlier than max_delay or Retry-After seconds later. Values rejected with an
+    auth or client error are not sent again and are counted in rejected. Above max_buffer values the oldest
+    values are dropped and counted in dropped.
+    Rejected, dropped and values not delivered by the last flush at close go to dead letters of their bots.
+    """
+
+    delivers_later = True
+    blocking = True
+
+    def __init__(self, session, url: str = THINGSPEAK_URL + '/channels/{channel}/bulk_update.json',
+                 group_by: str = 'channel', batch_size: int = 960, max_delay: float = 60,
+                 max_buffer: int = 100000) -> None:
+        if group_by not in ('channel', 'none'):
+            raise ValueError(f"Incorrect sink config. Unknown group_by: {group_by}")
+        self.session = session
+        self.url = url
+        self.group_by = group_by
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.max_buffer = max_buffer
+        self.buffer = {}  # (channel, api_key) or None -> list of (bot, pending, update)
+        self.size = 0
+        self.oldest_time = None
+        self.retry_time = None  # After a failed flush the next one waits for max_delay
+        self.requests = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_config(cls, sink_config: dict, session) -> 'BulkSink':
+        kwargs = {}
+        for key in ['url', 'group_by']:
+            if key in sink_config.keys():
+                kwargs[key] = sink_config[key]
+        for key in ['batch_size', 'max_buffer']:
+            if key in sink_config.keys():
+                kwargs[key] = int(sink_config[key])
+        if 'max_delay' in sink_config.keys():
+            kwargs['max_delay'] = float(sink_config['max_delay'])
+        return cls(session, **kwargs)
+
+    def send(self, bot, pending) -> None:
+        update = {'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(pending.created_time))}
+        update.update(zip(bot.url_encoder.fields_of(pending.values), pending.values))
+        if self.group_by == 'channel':
+            key = (bot.channel, bot.api_key)
+        else:
+            key = None
+            update['channel'] = bot.channel
+            update['write_api_key'] = bot.api_key
+        self.buffer.setdefault(key, []).append((bot, pending, update))
+        self.size += 1
+        if self.size > self.max_buffer:
+            self._drop_overflow()
+        now = pending.created_time
+        if self.oldest_time is None:
+            self.oldest_time = now
+        if self.retry_time is not None and now < self.retry_time:
+            return
+        if self.size >= self.batch_size or now - self.oldest_time >= self.max_delay:
+            self.flush(now)
+
+    def due_time(self) -> float:
+        """Time when the oldest value waited for max_delay, not earlier than the retry of a failed flush"""
+        if not self.size:
+            return None
+        due_time = self.oldest_time + self.max_delay
+        return max(due_time, self.retry_time) if self.retry_time is not None else due_time
+
+    def poll(self, now: float) -> None:
+        """Flush buffer if the oldest value waited for max_delay"""
+        due_time = self.due_time()
+        if due_time is not None and now >= due_time:
+            self.flush(now)
+
+    def _post(self, key, updates: list) -> None:
+        if key is None:
+            response = self.session.post(self.url, json={'updates': updates})
+        else:
+            channel, api_key = key
+            response = self.session.post(self.url.format(channel=channel),
+                                         json={'write_api_key': api_key, 'updates': updates})
+        check_response(response.status_code, response.content, response.headers.get('Retry-After'))
+
+    def flush(self, now: float = None) -> None:
+        """Send all buffered values, one request per group"""
+        failed = {}
+        retry_after = self.max_delay
+        for key, updates in self.buffer.items():
+            for start in range(0, len(updates), self.batch_size):
+                batch = updates[start:start + self.batch_size]
+                self.requests += 1
+                try:
+                    self._post(key, [update for bot, pending, update in batch])
+                except Exception as e:
+                    result = e.result if isinstance(e, SendError) else SERVER_ERROR
+                    for bot, pending, update in batch:
+                        pending.result = result
+                        pending.error = repr(e)
+                        bot.record_failed(result)
+                    if result in FINAL_RESULTS:
+                        self.rejected += len(batch)
+                        self._dead_letters(batch)
+                        continue
+                    if isinstance(e, SendError) and e.retry_after is not None:
+                        retry_after = max(retry_after, e.retry_after)
+                    failed.setdefault(key, []).extend(batch)
+                    continue
+                for bot, pending, update in batch:
+                    bot.record_sent()
+        self.buffer = failed
+        self.size = sum(len(updates) for updates in failed.values())
+        if not self.size:
+            self.oldest_time = None
+            self.retry_time = None
+            return
+        self.retry_time = now + retry_after if now is not None else None
+        self._drop_overflow()
+
+    def _drop_overflow(self) -> None:
+        """Drop the oldest values if buffer is larger than max_buffer"""
+        for updates in self.buffer.values():
+            if self.size <= self.max_buffer:
+                return
+            drop = min(len(updates), self.size - self.max_buffer)
+            self._dead_letters(updates[:drop])
+            del updates[:drop]
+            self.size -= drop
+            self.dropped += drop
+
+    @staticmethod
+    def _dead_letters(batch: list) -> None:
+        """Move values which will not be sent to dead letters of their bots"""
+        for bot, pending, update in batch:
+            bot.dead_letters.add(bot.bot_name, pending, bot.clock.time())
+
+    def close(self) -> None:
+        """Flush buffer, values which are still not delivered go to dead letters"""
+        self.flush()
+        for updates in self.buffer.values():
+            self._dead_letters(updates)
+        self.buffer = {}
+        self.size = 0
+        self.oldest_time = None
+
+
+SINKS = {
+    'thingspeak': HttpSink,
+    'http': HttpSink,
+    'file': FileSink,
+    'csv': ColumnarSink,
+    'parquet': ColumnarSink,
+    'ring': RingSink,
+    'bulk': BulkSink
+}
+
+
+def create_sink(sink_config: dict, session) -> Sink:
+    """Create sink from 'sink' part of bot_farm_config or bot_config: {"type": sink_type, ...}"""
+    if not isinstance(sink_config, dict):
+        raise TypeError(f"Incorrect sink config. Must be dict, but now: {type(sink_config)}")
+    sink_type = sink_config['type'] if 'type' in sink_config.keys() else 'thingspeak'
+    if sink_type not in SINKS:
+        raise Exception(f"Incorrect sink config. Unknown sink type: {sink_type}. Avaliable: {list(SINKS)}")
+    return SINKS[sink_type].from_config(dict(sink_config, type=sink_type), session)
@@ -0,0 +1,52 @@
+"""Count requests needed to deliver one simulated day of config_32 through the bulk sink.
+
+The farm runs on virtual clock and sends to the local stub server. Without batching every value
+is a separate request. Values are grouped per channel (thingspeak bulk-update) or all bots together.
+
+Run from the repository root:
+    python -m benchmarks.bulk_benchmark
+"""
+import contextlib
+import io
+import json
+import time
+from Bot_farm.bot_farm import BotFarm
+from benchmarks.stub_server import StubServer
+
+
+SINKS = {
+    'per channel, max_delay=3600': {'type': 'bulk', 'url': '/channels/{channel}/bulk_update.json',
+                                    'group_by': 'channel', 'max_delay': 3600},
+    'all bots, max_delay=60': {'type': 'bulk', 'url': '/bulk_update.json', 'group_by': 'none', 'max_delay': 60},
+    'all bots, max_delay=3600': {'type': 'bulk', 'url': '/bulk_update.json', 'group_by': 'none', 'max_delay': 3600}
+}
+
+
+def run(sink_config: dict) -> None:
+    with open('config/config_32.json') as f:
+        config = json.load(f)
+    with StubServer() as server:
+        sink_config = dict(sink_config, url=server.base_url + sink_config['url'])
+        config.update({
+            'clock': 'virtual',
+            'start_time': 1700000000,
+            'duration': 86400,
+            'seed': 1,
+            'sink': sink_config
+        })
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            BotFarm(config).start()
+        elapsed = time.perf_counter() - started
+        print(f"{server.values} values delivered with {server.requests} requests in {elapsed:.1f} s "
+              f"({server.values / max(server.requests, 1):.0f} values per request)")
+
+
+def main() -> None:
+    for name, sink_config in SINKS.items():
+        print(f"{name}: ", end='')
+        run(sink_config)
+
+
+if __name__ == "__main__":
+    main()
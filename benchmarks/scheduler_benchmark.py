@@ -0,0 +1,59 @@
+"""Compare dispatch cost of the Scheduler with the old linear min() scan over the timetable.
+
+Run from the repository root:
+    python -m benchmarks.scheduler_benchmark
+"""
+import random
+import time
+from Bot_farm.scheduler import Scheduler
+
+
+BOT_COUNTS = [10, 100, 1000, 10000, 100000]
+DISPATCHES = 10000
+LINEAR_LIMIT = 10000  # Linear scan becomes too slow to wait for above this size
+
+
+class FakeBot:
+    """Only the attributes used by the scheduler"""
+
+    def __init__(self, update_time: int) -> None:
+        self.update_time = update_time
+        self.next_send_time = random.uniform(0, update_time)
+
+
+def heap_dispatch(bots: list, dispatches: int) -> float:
+    scheduler = Scheduler(bots)
+    started = time.perf_counter()
+    for _ in range(dispatches):
+        next_send_time, bot = scheduler.pop()
+        bot.next_send_time = next_send_time + bot.update_time
+        scheduler.add(bot)
+    return (time.perf_counter() - started) / dispatches
+
+
+def linear_dispatch(bots: list, dispatches: int) -> float:
+    started = time.perf_counter()
+    for _ in range(dispatches):
+        timetable = []
+        for bot in bots:
+            timetable.append(bot.next_send_time)
+        val, idx = min((val, idx) for (idx, val) in enumerate(timetable))
+        bots[idx].next_send_time = val + bots[idx].update_time
+    return (time.perf_counter() - started) / dispatches
+
+
+def main() -> None:
+    random.seed(0)
+    print(f"{'bots':>8} {'heap, us':>10} {'linear, us':>12}")
+    for bot_count in BOT_COUNTS:
+        bots = [FakeBot(300) for _ in range(bot_count)]
+        heap_cost = heap_dispatch(bots, DISPATCHES) * 1e6
+        if bot_count <= LINEAR_LIMIT:
+            linear_cost = f"{linear_dispatch(bots, DISPATCHES // 10) * 1e6:12.2f}"
+        else:
+            linear_cost = f"{'-':>12}"
+        print(f"{bot_count:>8} {heap_cost:10.2f} {linear_cost}")
+
+
+if __name__ == "__main__":
+    main()
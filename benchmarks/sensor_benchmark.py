@@ -0,0 +1,115 @@
+"""Compare measure throughput and memory of the table-driven Sensor with the old per-type classes.
+
+LegacyTemperatureSensor is the TemperatureSensor as it was before the sensor table.
+
+Run from the repository root:
+    python -m benchmarks.sensor_benchmark
+"""
+import random
+import time
+import tracemalloc
+from Sensors.sensors import TENDS, TemperatureSensor
+
+
+MEASURES = 1000000
+INSTANCES = 100000
+
+
+class LegacySensor:
+
+    def __init__(self, sensor_config: dict) -> None:
+        self.sensor_config = sensor_config
+        self.field = self.sensor_config['field']
+        self.tend = self._start_tend
+
+    @property
+    def _start_tend(self):
+        self.set_tend_time = time.time()
+        return self.sensor_config['tend'] if 'tend' in self.sensor_config.keys() else 'normal'
+
+    def change_tend(self):
+        self.tend = random.choice(list(TENDS - {self.tend}))
+
+
+class LegacyTemperatureSensor(LegacySensor):
+
+    def __init__(self, sensor_config):
+        super().__init__(sensor_config)
+        self.min_value = self._min_value
+        self.max_value = self._max_value
+        self.current_value = self._start_value
+        self.sensor_name = 'Temperature'
+
+    @property
+    def _min_value(self):
+        return int(self.sensor_config['min_value']) if 'min_value' in self.sensor_config.keys() else -40
+
+    @property
+    def _max_value(self):
+        return int(self.sensor_config['max_value']) if 'max_value' in self.sensor_config.keys() else 50
+
+    @property
+    def _start_value(self):
+        return int(self.sensor_config['start_value']) if 'start_value' in self.sensor_config.keys() else 25
+
+    @property
+    def delta_temperature(self):
+        if self.tend == 'fast_decrease':
+            return random.uniform(-1, -0.2)
+
+        if self.tend == 'decrease':
+            return random.uniform(-0.5, -0.1)
+
+        if self.tend == 'normal':
+            return random.uniform(-0.3, 0.3)
+
+        if self.tend == 'increase':
+            return random.uniform(0.1, 0.5)
+
+        if self.tend == 'fast_increase':
+            return random.uniform(0.2, 1)
+
+    def measure(self):
+        if time.time() - self.set_tend_time > 28800:  # Change tend every 8h
+            self.change_tend()
+
+        new_value = round(self.current_value + self.delta_temperature, 2)
+        if new_value > self.max_value:
+            new_value = self.max_value
+        elif new_value < self.min_value:
+            new_value = self.min_value
+
+        self.current_value = new_value
+
+
+def measure_rate(sensor_class, tend: str) -> float:
+    sensor = sensor_class({'field': 'field1', 'tend': tend})
+    started = time.perf_counter()
+    for _ in range(MEASURES):
+        sensor.measure()
+    return MEASURES / (time.perf_counter() - started)
+
+
+def memory_per_instance(sensor_class) -> float:
+    config = {'field': 'field1'}
+    tracemalloc.start()
+    sensors = [sensor_class(config) for _ in range(INSTANCES)]
+    for sensor in sensors:
+        sensor.measure()  # State of random streams is allocated by the first measure
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del sensors
+    return size / INSTANCES
+
+
+def main() -> None:
+    print(f"{'tend':>14} {'old, measure/s':>16} {'new, measure/s':>16}")
+    for tend in ('fast_decrease', 'normal', 'fast_increase'):
+        print(f"{tend:>14} {measure_rate(LegacyTemperatureSensor, tend):16.0f} "
+              f"{measure_rate(TemperatureSensor, tend):16.0f}")
+    print(f"Memory per sensor: old {memory_per_instance(LegacyTemperatureSensor):.0f} B, "
+          f"new {memory_per_instance(TemperatureSensor):.0f} B")
+
+
+if __name__ == "__main__":
+    main()
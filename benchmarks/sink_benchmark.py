@@ -0,0 +1,49 @@
+"""Generation throughput of the farm with local sinks, without network.
+
+The farm runs config_32 on virtual clock for a simulated week.
+
+Run from the repository root:
+    python -m benchmarks.sink_benchmark
+"""
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import tempfile
+import time
+from Bot_farm.bot_farm import BotFarm
+
+
+DURATION = 7 * 86400
+
+
+def sink_configs(folder: str) -> dict:
+    configs = {
+        'ring': {'type': 'ring'},
+        'file': {'type': 'file', 'file_name': os.path.join(folder, 'readings.jsonl')},
+        'csv': {'type': 'csv', 'file_name': os.path.join(folder, 'readings.csv')}
+    }
+    if importlib.util.find_spec('pyarrow') is not None:
+        configs['parquet'] = {'type': 'parquet', 'file_name': os.path.join(folder, 'readings.parquet')}
+    return configs
+
+
+def main() -> None:
+    with open('config/config_32.json') as f:
+        config = json.load(f)
+    with tempfile.TemporaryDirectory() as folder:
+        for name, sink_config in sink_configs(folder).items():
+            config.update({'clock': 'virtual', 'start_time': 1700000000, 'duration': DURATION, 'seed': 1,
+                           'sink': sink_config})
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                farm = BotFarm(config)
+                farm.start()
+            elapsed = time.perf_counter() - started
+            sent = farm.stats()['sent']
+            print(f"{name:>8}: {sent} sends in {elapsed:.2f} s, {sent / elapsed:.0f} sends/s")
+
+
+if __name__ == "__main__":
+    main()
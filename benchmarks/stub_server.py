@@ -0,0 +1,92 @@
+"""Local stub of thingspeak update API which counts requests and received values.
+
+    GET  /update?api_key=...&field1=...                 - one value, responds with entry id, or with "0" like
+                                                          thingspeak if api_key sent less than channel_interval ago
+    POST /channels/<channel>/bulk_update.json           - {"write_api_key": ..., "updates": [...]}
+    POST /bulk_update.json                              - {"updates": [...]}, updates of many channels
+
+Run standalone from the repository root:
+    python -m benchmarks.stub_server [port]
+"""
+import json
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlsplit
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+    disable_nagle_algorithm = True  # Headers and body are written separately
+
+    def _respond(self, body: bytes, status: int = 200) -> None:
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if not self.path.startswith('/update'):
+            self._respond(b'0', 404)
+            return
+        api_key = parse_qs(urlsplit(self.path).query).get('api_key', [''])[0]
+        now = time.monotonic()
+        with self.server.lock:
+            self.server.requests += 1
+            last_time = self.server.last_times.get(api_key)
+            if last_time is not None and now - last_time < self.server.channel_interval:
+                self.server.throttled += 1
+                entry_id = 0
+            else:
+                self.server.last_times[api_key] = now
+                self.server.values += 1
+                entry_id = self.server.values
+        self._respond(str(entry_id).encode())
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if not self.path.endswith('/bulk_update.json'):
+            self._respond(b'{"success": false}', 404)
+            return
+        updates = json.loads(body)['updates']
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.values += len(updates)
+        self._respond(b'{"success": true}', 202)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """Stub server running in a background thread. Updates of a channel (api_key) more often than
+    channel_interval seconds are throttled"""
+
+    def __init__(self, port: int = 0, channel_interval: float = 0) -> None:
+        super().__init__(('127.0.0.1', port), StubHandler)
+        self.lock = threading.Lock()
+        self.channel_interval = channel_interval
+        self.last_times = {}  # api_key -> time of the last accepted update
+        self.requests = 0
+        self.values = 0
+        self.throttled = 0
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def __enter__(self) -> 'StubServer':
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    with StubServer(int(sys.argv[1]) if len(sys.argv) > 1 else 8000) as server:
+        print(f"Stub server on {server.base_url}")
+        server.thread.join()
@@ -1,6 +1,27 @@
-import os
+import argparse
 import json
+import os
+import signal
+import sys
+import time
+from Config_compiler.config_compiler import load_config, ConfigCompiler, ConfigError
 from Bot_farm.bot_farm import BotFarm
+from Bot_farm.async_bot_farm import AsyncBotFarm
+from Bot_farm.sharded import ShardSupervisor
+from Bot_farm.bot_configs import count_bot_configs
+from Bot_farm.logs import setup_logging
+
+
+FARM_MODES = {
+    'sync': BotFarm,
+    'async': AsyncBotFarm
+}
+RUN_MODES = {  # Run mode -> clock of the farm
+    'real-time': 'wall',
+    'accelerated': 'virtual',
+    'dry-run': 'virtual'
+}
+CONFIG_FOLDER = 'config'
 
 
 def json_files_from_folder(folder: str) -> list:
@@ -11,48 +32,181 @@ def json_files_from_folder(folder: str) -> list:
         splitted_filename = file_name.split(".")
         if splitted_filename[-1] == "json":
             files.append(file_name)
-    return files
-
+    return sorted(files)
 
-def select_config_file(config_files) -> int:
-    """Print all files in list as a table for choice"""
 
-    print("Select a config file")
-    expected_choice = []  # Save all possible variants to check input
-    for num, config_file in enumerate(config_files):
-        expected_choice.append(str(num + 1))
-        print(f"{num + 1} - {config_file}")
-    choice = input()
-    assert choice in expected_choice, "Incorrect choice, try again"
-    return int(choice)
-
-
-def choose_config(config_files: list) -> str:
-    """Return a config file from a list"""
+def config_file_address() -> str:
+    """Return the address of the only config file in 'config' folder"""
 
+    config_files = json_files_from_folder(CONFIG_FOLDER)
     if len(config_files) == 0:
-        raise Exception("There is no config file in 'config' folder")
-    elif len(config_files) == 1:
-        return config_files[0]
-    else:
-        choice = select_config_file(config_files)
-    return config_files[choice - 1]
+        raise Exception(f"There is no config file in '{CONFIG_FOLDER}' folder")
+    if len(config_files) > 1:
+        raise Exception(f"There are {len(config_files)} config files in '{CONFIG_FOLDER}' folder, "
+                        f"pass one of them: {', '.join(config_files)}")
+    return os.path.join(CONFIG_FOLDER, config_files[0])
+
+
+def parse_args(args=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Start bot farm. Options override keys of the config file")
+    parser.add_argument('config', nargs='?',
+                        help=f"config file (default: the only json file in '{CONFIG_FOLDER}' folder)")
+    parser.add_argument('--mode', choices=list(RUN_MODES),
+                        help="real-time - wall clock, accelerated - virtual clock without sleeping, "
+                             "dry-run - accelerated run with values kept in memory instead of sending "
+                             "(default: 'clock' key of config)")
+    parser.add_argument('--farm', choices=list(FARM_MODES), help="bot farm type ('mode' key of config)")
+    parser.add_argument('--workers', type=int, help="number of worker processes ('workers' key of config)")
+    parser.add_argument('--sink', help='sink type or sink config as json, e.g. \'{"type": "file", '
+                                       '"file_name": "values.jsonl"}\' (\'sink\' key of config)')
+    parser.add_argument('--duration', type=float, help="stop after seconds of farm time ('duration' key of config)")
+    parser.add_argument('--iterations', type=int,
+                        help="stop after number of measurements of all bots ('iterations' key of config)")
+    parser.add_argument('--seed', type=int, help="seed of random generator ('seed' key of config)")
+    parser.add_argument('--metrics', action='store_true',
+                        help="collect metrics without endpoint for send latency and schedule lag of summary, "
+                             "they cost time of every measure (on if 'metrics' key is in config)")
+    parser.add_argument('--per-bot', action='store_true',
+                        help="add attempted and effective sends of every bot to summary")
+    parser.add_argument('--json', action='store_true', help="print summary as one json line")
+    return parser.parse_args(args)
+
+
+def sink_config(sink: str) -> dict:
+    """--sink value: sink type or json of sink config"""
+    if sink.lstrip().startswith('{'):
+        try:
+            return json.loads(sink)
+        except ValueError as e:
+            raise ConfigError([f"--sink: Incorrect json: {e}"])
+    return {'type': sink}
+
+
+def apply_args(config: dict, args: argparse.Namespace) -> dict:
+    """Copy of compiled config with options of command line"""
+    config = dict(config)
+    if args.mode is not None:
+        config['clock'] = RUN_MODES[args.mode]
+    if args.farm is not None:
+        config['mode'] = args.farm
+    if args.workers is not None:
+        config['workers'] = args.workers
+    if args.sink is not None:
+        compiler = ConfigCompiler()
+        config['sink'] = compiler.sink(sink_config(args.sink), '--sink')
+        if compiler.errors:
+            raise ConfigError(compiler.errors)
+    if args.duration is not None:
+        config['duration'] = args.duration
+    if args.iterations is not None:
+        config['iterations'] = args.iterations
+    if args.seed is not None:
+        config['seed'] = args.seed
+    if args.mode == 'dry-run':
+        #  Nothing leaves the process: values are kept in memory, saved state and config file are not touched
+        config['sink'] = {'type': 'ring'}
+        for key in ('checkpoint', 'reload_interval', 'trajectory'):
+            config.pop(key, None)
+        if 'metrics' in config.keys():
+            config['metrics'] = {}
+        if 'duration' not in config.keys() and 'iterations' not in config.keys():
+            config['iterations'] = count_bot_configs(config)  # One measurement of every bot
+    if config.get('mode') == 'async' and config.get('clock') == 'virtual':
+        raise ConfigError(["--mode: accelerated and dry-run modes need 'sync' farm"])
+    if args.metrics and 'metrics' not in config.keys():
+        config['metrics'] = {}  # Metrics without endpoint, for latency statistics of the summary
+    return config
+
+
+def summary(bot_farm, elapsed: float, farm_time: float = None, per_bot: bool = False) -> dict:
+    """Throughput and latency statistics of a finished run. Sent values are accepted by server, attempted
+    are sent and failed attempts"""
+    stats = bot_farm.stats()
+    result = {'elapsed': round(elapsed, 3)}
+    if farm_time is not None:
+        result['farm_time'] = round(farm_time, 3)
+    result.update(stats)
+    attempted = stats.get('sent', 0) + stats.get('failed', 0)
+    for key in ('measurements', 'sent'):
+        result[f'{key}_per_second'] = round(stats.get(key, 0) / elapsed, 1) if elapsed > 0 else 0.0
+    result['attempted_per_second'] = round(attempted / elapsed, 1) if elapsed > 0 else 0.0
+    result['accepted_ratio'] = round(stats.get('sent', 0) / attempted, 3) if attempted else 0.0
+    metrics = getattr(bot_farm, 'metrics', None)
+    if metrics is not None:
+        latency = metrics.send_latency
+        result['send_latency_ms'] = {
+            'mean': round(latency.mean() * 1000, 3),
+            'p50': round(latency.quantile(0.5) * 1000, 3),
+            'p95': round(latency.quantile(0.95) * 1000, 3),
+            'p99': round(latency.quantile(0.99) * 1000, 3)
+        }
+        lag = metrics.schedule_lag
+        result['schedule_lag_s'] = {'mean': round(lag.mean(), 3), 'p99': round(lag.quantile(0.99), 3)}
+    if per_bot:
+        result['per_bot'] = bot_farm.bot_stats()
+    return result
+
+
+def print_summary(result: dict, as_json: bool = False) -> None:
+    if as_json:
+        print(json.dumps(result))
+        return
+    print("Bot farm summary")
+    for key, value in result.items():
+        if key == 'per_bot':
+            print(f"  {key}:")
+            for bot_name, bot_stats in value.items():
+                print(f"    {bot_name}: " + ', '.join(f"{name} {number}" for name, number in bot_stats.items()))
+            continue
+        if isinstance(value, dict):
+            value = ', '.join(f"{name} {number}" for name, number in value.items())
+        print(f"  {key}: {value}")
+
+
+def interrupt(signum, frame) -> None:
+    """SIGTERM stops the farm like Ctrl+C: checkpoint is saved, sinks are closed"""
+    raise KeyboardInterrupt
+
+
+def main(args=None) -> int:
+    args = parse_args(args)
+    try:
+        config_file = args.config if args.config is not None else config_file_address()
+        #  Load, check and compile config file. Compiled config is cached in .cache folder next to it
+        config = apply_args(load_config(config_file, write_cache=args.mode != 'dry-run'), args)
+    except ConfigError as e:
+        print(e, file=sys.stderr)
+        return 2
+    except Exception as e:
+        print(f"Incorrect config: {e}", file=sys.stderr)
+        return 2
+
+    setup_logging(config['logging'] if 'logging' in config.keys() else None,
+                  config['seed'] if 'seed' in config.keys() else None)
 
-
-def config_file_address() -> str:
-    """Return the address of config file"""
-
-    config_files = json_files_from_folder("config")
-    config_file = choose_config(config_files)  # Choice a config file if there is more then 1 in config folder
-    return config_file
+    #  Initialization and startup of bot farm with all bots described in config file
+    mode = config['mode'] if 'mode' in config.keys() else 'sync'
+    workers = int(config['workers']) if 'workers' in config.keys() else 1
+    if workers > 1:
+        bot_farm = ShardSupervisor(config, FARM_MODES[mode])
+    else:
+        bot_farm = FARM_MODES[mode](config)
+    if 'reload_interval' in config.keys():
+        bot_farm.watch_config(config_file, config['reload_interval'])
+
+    signal.signal(signal.SIGTERM, interrupt)
+    clock = getattr(bot_farm, 'clock', None)
+    farm_start_time = clock.time() if clock is not None else None
+    start_time = time.perf_counter()
+    try:
+        bot_farm.start()
+    except KeyboardInterrupt:
+        pass
+    elapsed = time.perf_counter() - start_time
+    print_summary(summary(bot_farm, elapsed, clock.time() - farm_start_time if clock is not None else None,
+                          args.per_bot), args.json)
+    return 0
 
 
 if __name__ == "__main__":
-
-    #  Load config file
-    with open(os.path.join("config", config_file_address())) as f:
-        config = json.load(f)
-
-    #  Initialization and startup of bot farm with all bots described in config file
-    bot_farm = BotFarm(config)
-    bot_farm.start()
+    sys.exit(main())
@@ -0,0 +1,43 @@
+import json
+import threading
+from Bot_farm.async_bot_farm import AsyncBotFarm
+from Sinks.sinks import BulkSink
+from benchmarks.stub_server import StubServer
+
+
+def async_config(sink: dict) -> dict:
+    return {'sink': sink, 'iterations': 6, 'seed': 1,
+            'profiles': {'city': {'email': 'a@x', 'api_key': 'K{n}', 'update_time': 1,
+                                  'sensors': [{'temperature': {'field': 'field1'}}]}},
+            'bot_groups': [{'count': 3, 'profile': 'city'}]}
+
+
+def test_async_farm_closes_file_sink(tmp_path):
+    file_name = tmp_path / 'values.jsonl'
+    farm = AsyncBotFarm(async_config({'type': 'file', 'file_name': str(file_name)}))
+    farm.start()
+    with open(file_name) as f:
+        readings = [json.loads(line) for line in f]
+    assert len(readings) == farm.measurements == 6
+
+
+def test_async_farm_flushes_bulk_sink():
+    with StubServer() as server:
+        farm = AsyncBotFarm(async_config({'type': 'bulk', 'url': server.base_url + '/bulk_update.json',
+                                          'group_by': 'none'}))
+        farm.start()
+        assert server.values == farm.stats()['sent'] == farm.measurements == 6
+
+
+def test_async_farm_calls_bulk_sink_outside_event_loop(monkeypatch):
+    threads = set()
+    send = BulkSink.send
+
+    def record_thread(sink, bot, pending) -> None:
+        threads.add(threading.current_thread().name)
+        send(sink, bot, pending)
+
+    monkeypatch.setattr(BulkSink, 'send', record_thread)
+    with StubServer() as server:
+        AsyncBotFarm(async_config({'type': 'bulk', 'url': server.base_url + '/bulk_update.json'})).start()
+    assert threads and threading.main_thread().name not in threads
@@ -0,0 +1,66 @@
+import random
+from Bot_farm.bot_farm import BotFarm
+from benchmarks.stub_server import StubServer
+
+
+def group_config(count: int, **kwargs) -> dict:
+    config = {'clock': 'virtual', 'start_time': 1000, 'sink': {'type': 'ring'},
+              'profiles': {'city': {'email': 'a@x', 'api_key': 'K', 'update_time': 300,
+                                    'sensors': [{'temperature': {'field': 'field1'}}]}},
+              'bot_groups': [{'count': count, 'profile': 'city'}]}
+    config.update(kwargs)
+    return config
+
+
+def test_bots_are_created_when_due():
+    farm = BotFarm(group_config(1000, schedule={'phase': 'even'}, iterations=10))
+    farm.start()
+    assert farm.measurements == 10
+    assert len(farm.bots) == 10
+    assert farm.clock.time() == 1000 + 9 * 300 / 1000
+
+
+def test_first_sends_have_no_lag():
+    farm = BotFarm(group_config(10, schedule={'phase': 'even'}, iterations=20, metrics={}))
+    farm.start()
+    assert farm.metrics.schedule_lag.count() == 20
+    assert farm.metrics.schedule_lag.max[''] == 0
+
+
+def test_farm_without_bots_stops():
+    farm = BotFarm(group_config(1, duration=3600))
+    for bot in list(farm.bots):
+        farm.remove_bot(bot)
+    farm.step()
+    farm.start()
+    assert farm.measurements == 0
+
+
+def test_seeded_farm_draws_phases_from_own_generator():
+    state = random.getstate()
+    phases = []
+    for _ in range(2):
+        farm = BotFarm(group_config(5, seed=7, schedule={'phase': 'random', 'jitter': 10}, iterations=5))
+        farm.start()
+        phases.append([bot.next_send_time for bot in farm.bots])
+    assert phases[0] == phases[1]
+    assert random.getstate() == state
+
+
+def test_farm_flushes_bulk_sink_after_max_delay():
+    with StubServer() as server:
+        farm = BotFarm(group_config(1, sink={'type': 'bulk', 'url': server.base_url + '/bulk_update.json',
+                                             'group_by': 'none', 'max_delay': 60}))
+        farm.step()
+        assert (farm.measurements, server.values) == (1, 0)
+        farm.step()
+        assert (farm.measurements, farm.clock.time()) == (1, 1060)
+        farm.step()
+        assert (farm.measurements, server.values, farm.sink.size) == (2, 1, 1)
+
+
+def test_dead_letters_are_stamped_with_farm_clock():
+    farm = BotFarm(group_config(1, sink={'type': 'http', 'base_url': 'http://127.0.0.1:1'},
+                                retry={'max_attempts': 1}, iterations=1))
+    farm.start()
+    assert [letter['dead_time'] for letter in farm.dead_letters.letters] == [1000]
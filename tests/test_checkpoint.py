@@ -0,0 +1,25 @@
+import json
+import os
+from Bot_farm.bot_farm import BotFarm
+
+
+CONFIG_32 = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config', 'config_32.json')
+
+
+def sensor_states(farm: BotFarm) -> dict:
+    return {bot.bot_name: [(sensor.current_value, sensor.tend) for sensor in bot.sensors] for bot in farm.bots}
+
+
+def test_restored_farm_continues_like_uninterrupted_one(tmp_path):
+    with open(CONFIG_32) as f:
+        config = json.load(f)
+    config.update({'clock': 'virtual', 'seed': 11, 'sink': {'type': 'ring'}, 'tend_change_time': 3600})
+    checkpoint = {'file_name': str(tmp_path / 'farm.ckpt')}
+    uninterrupted = BotFarm(dict(config, start_time=1.7e9, duration=14400))
+    uninterrupted.start()
+    first = BotFarm(dict(config, start_time=1.7e9, duration=7200, checkpoint=checkpoint))
+    first.start()
+    restored = BotFarm(dict(config, duration=7200, checkpoint=checkpoint))
+    restored.start()
+    assert first.measurements + restored.measurements == uninterrupted.measurements
+    assert sensor_states(restored) == sensor_states(uninterrupted)
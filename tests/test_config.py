@@ -0,0 +1,70 @@
+import json
+import os
+import pytest
+from Config_compiler.config_compiler import compile_config, load_config, ConfigError
+
+
+SENSORS = [{'temperature': {'field': 'field1'}}]
+
+
+def config(bots=(), groups=()) -> dict:
+    result = {'profiles': {'city': {'email': 'a@x', 'api_key': 'K', 'sensors': SENSORS}}}
+    if bots:
+        result['bots'] = [{'email': 'a@x', 'channel': '1', 'bot_name': name, 'api_key': 'K', 'sensors': SENSORS}
+                          for name in bots]
+    if groups:
+        result['bot_groups'] = [dict(group, profile='city') for group in groups]
+    return result
+
+
+def errors(bot_farm_config: dict) -> list:
+    with pytest.raises(ConfigError) as e:
+        compile_config(bot_farm_config)
+    return e.value.errors
+
+
+@pytest.mark.parametrize('bot_farm_config', [
+    config(bots=['bot_1', 'bot_1']),
+    config(groups=[{'count': 10}, {'count': 10}]),
+    config(groups=[{'count': 10}, {'count': 10, 'start': 10}]),
+    config(bots=['bot_5'], groups=[{'count': 10}]),
+    config(bots=['city_007'], groups=[{'count': 10, 'bot_name': 'city_{n:03d}'}]),
+    config(groups=[{'count': 2, 'bot_name': 'city'}]),
+    config(groups=[{'count': 1, 'bot_name': 'city'}, {'count': 1, 'bot_name': 'city', 'start': 5}])
+])
+def test_duplicate_bot_names_are_rejected(bot_farm_config):
+    assert any('bot_name' in error or 'overlap' in error or 'same name' in error for error in errors(bot_farm_config))
+
+
+@pytest.mark.parametrize('bot_farm_config', [
+    config(groups=[{'count': 10}, {'count': 10, 'start': 11}]),
+    config(groups=[{'count': 10}, {'count': 10, 'bot_name': 'town_{n}'}]),
+    config(bots=['bot_11', 'bot_01'], groups=[{'count': 10}]),
+    config(groups=[{'count': 1, 'bot_name': 'city'}])
+])
+def test_different_bot_names_are_accepted(bot_farm_config):
+    compile_config(bot_farm_config)
+
+
+def write_group_config(tmp_path, api_key_file) -> str:
+    file_name = tmp_path / 'farm.json'
+    file_name.write_text(json.dumps(config(groups=[{'count': 2, 'api_key_file': str(api_key_file)}])))
+    return str(file_name)
+
+
+def test_cached_config_checks_key_file_again(tmp_path):
+    api_key_file = tmp_path / 'keys.txt'
+    api_key_file.write_text('K1\nK2\n')
+    file_name = write_group_config(tmp_path, api_key_file)
+    load_config(file_name)
+    assert os.listdir(tmp_path / '.cache')
+    api_key_file.unlink()
+    with pytest.raises(ConfigError, match='No such file'):
+        load_config(file_name)
+
+
+def test_config_without_cache_writing(tmp_path):
+    api_key_file = tmp_path / 'keys.txt'
+    api_key_file.write_text('K1\nK2\n')
+    load_config(write_group_config(tmp_path, api_key_file), write_cache=False)
+    assert not (tmp_path / '.cache').exists()
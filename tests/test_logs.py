@@ -0,0 +1,17 @@
+import logging
+import random
+from Bot_farm.logs import SamplingFilter
+
+
+def sampled(seed) -> list:
+    sampling_filter = SamplingFilter(0.5, seed)
+    record = logging.LogRecord('bot', logging.DEBUG, __file__, 0, 'measure', None, None)
+    return [sampling_filter.filter(record) for _ in range(100)]
+
+
+def test_seeded_sampling_keeps_the_same_records_without_global_random():
+    state = random.getstate()
+    records = sampled(3)
+    assert random.getstate() == state
+    assert records == sampled(3) != sampled(4)
+    assert 0 < sum(records) < 100
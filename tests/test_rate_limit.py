@@ -0,0 +1,75 @@
+import json
+import os
+from Bot.rate_limit import RateLimiter
+from Bot_farm.bot_configs import iter_bot_configs
+from Bot_farm.bot_farm import BotFarm
+from Bot_farm.sharded import ShardSupervisor
+
+
+CONFIG_32 = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config', 'config_32.json')
+
+
+def config_32(**kwargs) -> dict:
+    with open(CONFIG_32) as f:
+        config = json.load(f)
+    for bot_config in config['bots']:
+        bot_config['update_time'] = 15
+    config.update({'clock': 'virtual', 'start_time': 0, 'duration': 3600, 'sink': {'type': 'ring', 'capacity': 100000},
+                   'rate_limit': {'channel_interval': 15}})
+    config.update(kwargs)
+    return config
+
+
+def test_channels_of_accounts_have_own_buckets():
+    limiter = RateLimiter(channel_interval=15)
+    assert limiter.acquire('a@x', '1', 0) == 0
+    assert limiter.acquire('b@x', '1', 0) == 0
+    assert limiter.acquire('a@x', '1', 1) == 14
+
+
+def test_throttle_delays_only_its_channel():
+    limiter = RateLimiter(channel_interval=15)
+    limiter.throttle('a@x', '1', 0, 60)
+    assert limiter.acquire('a@x', '1', 30) == 30
+    assert limiter.acquire('b@x', '1', 30) == 0
+
+
+def test_rate_limit_is_fair_across_accounts():
+    config = config_32()
+    farm = BotFarm(config)
+    farm.start()
+    sends = {bot.bot_name: bot.sent_count for bot in farm.bots}
+    assert len(sends) == len(config['bots'])
+    assert min(sends.values()) >= 239
+    assert farm.stats()['rate_limited'] == 0
+
+
+def test_shards_keep_whole_channel_limit():
+    config = config_32(workers=4)
+    sends = {}
+    for shard_config in ShardSupervisor(config).shard_configs:
+        assert shard_config['rate_limit'] == config['rate_limit']
+        farm = BotFarm(shard_config)
+        farm.start()
+        sends.update({bot.bot_name: bot.sent_count for bot in farm.bots})
+    assert len(sends) == len(config['bots'])
+    assert min(sends.values()) >= 239
+
+
+def test_shards_keep_accounts_with_account_limit():
+    config = config_32(workers=4, rate_limit={'channel_interval': 15, 'account_interval': 1})
+    emails = [{bot_config['email'] for bot_config in iter_bot_configs(shard_config)}
+              for shard_config in ShardSupervisor(config).shard_configs]
+    assert sum(len(shard_emails) for shard_emails in emails) == len({bot['email'] for bot in config['bots']})
+
+
+def test_reload_keeps_bots_in_their_shards():
+    config = config_32(workers=2)
+    for shard_config in ShardSupervisor(config).shard_configs:
+        farm = BotFarm(dict(shard_config, duration=600))
+        farm.start()
+        values = {bot.bot_name: bot.sensors[0].current_value for bot in farm.bots}
+        new_bot = dict(config['bots'][0], bot_name='bot_new', channel='100')
+        counts = farm.reload({'bots': [new_bot] + config['bots']})
+        assert counts['removed'] == 0 and counts['added'] <= 1
+        assert {bot.bot_name: bot.sensors[0].current_value for bot in farm.bots} == values
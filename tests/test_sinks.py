@@ -0,0 +1,97 @@
+from Bot.retry import DeadLetterStore, PendingSend
+from Bot.url_encoder import UrlEncoder
+from Bot_farm.clock import VirtualClock
+from Sinks.sinks import THROTTLED, BulkSink
+
+
+class Response:
+    def __init__(self, status_code: int, content: bytes, headers: dict = None) -> None:
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+class Session:
+    def __init__(self, *responses) -> None:
+        self.responses = list(responses)
+        self.posts = []
+
+    def post(self, url, json):
+        self.posts.append(json)
+        return self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+
+
+class CountingBot:
+    def __init__(self, channel: str) -> None:
+        self.channel = channel
+        self.bot_name = 'bot' + channel
+        self.api_key = 'K' + channel
+        self.url_encoder = UrlEncoder(self.api_key, [])
+        self.sent = 0
+        self.failed = []
+        self.dead_letters = DeadLetterStore()
+        self.clock = VirtualClock(500)
+
+    def record_sent(self) -> None:
+        self.sent += 1
+
+    def record_failed(self, result: str) -> None:
+        self.failed.append(result)
+
+
+def pending(created_time: float) -> PendingSend:
+    return PendingSend((20.5,), created_time)
+
+
+def test_bulk_values_count_as_sent_after_accepted_flush():
+    sink = BulkSink(Session(Response(202, b'{"success": true}')), batch_size=2)
+    bot = CountingBot('1')
+    sink.send(bot, pending(0))
+    assert bot.sent == 0
+    sink.send(bot, pending(1))
+    assert (bot.sent, bot.failed, sink.size) == (2, [], 0)
+
+
+def test_bulk_throttled_flush_counts_failed_and_keeps_values():
+    session = Session(Response(429, b'', {'Retry-After': '120'}), Response(202, b'{"success": true}'))
+    sink = BulkSink(session, batch_size=1, max_delay=60)
+    bot = CountingBot('1')
+    sink.send(bot, pending(0))
+    assert (bot.sent, bot.failed, sink.size, sink.retry_time) == (0, [THROTTLED], 1, 120)
+    sink.send(bot, pending(100))
+    assert len(session.posts) == 1
+    sink.send(bot, pending(120))
+    assert (bot.sent, bot.failed, sink.size) == (3, [THROTTLED], 0)
+
+
+def test_bulk_rejected_values_are_not_sent_again():
+    sink = BulkSink(Session(Response(401, b''), Response(202, b'{"success": true}')), batch_size=1)
+    bot = CountingBot('1')
+    sink.send(bot, pending(0))
+    assert (bot.sent, bot.failed, sink.size, sink.rejected) == (0, ['auth_error'], 0, 1)
+    assert [letter['result'] for letter in bot.dead_letters.letters] == ['auth_error']
+    sink.send(bot, pending(1))
+    assert (bot.sent, bot.dead_letters.count) == (1, 1)
+
+
+def test_bulk_overflow_and_unsent_values_at_close_go_to_dead_letters():
+    sink = BulkSink(Session(Response(500, b'')), batch_size=1, max_buffer=2)
+    bot = CountingBot('1')
+    for created_time in range(3):
+        sink.send(bot, pending(created_time))
+    assert (sink.size, sink.dropped, bot.dead_letters.count) == (2, 1, 1)
+    sink.close()
+    assert (sink.size, bot.dead_letters.count) == (0, 3)
+    assert [letter['created_time'] for letter in bot.dead_letters.letters] == [0, 1, 2]
+    assert {letter['dead_time'] for letter in bot.dead_letters.letters} == {500}
+
+
+def test_bulk_poll_flushes_values_after_max_delay():
+    sink = BulkSink(Session(Response(202, b'{"success": true}')), max_delay=60)
+    bot = CountingBot('1')
+    sink.send(bot, pending(0))
+    assert sink.due_time() == 60
+    sink.poll(59)
+    assert bot.sent == 0
+    sink.poll(60)
+    assert (bot.sent, sink.size, sink.due_time()) == (1, 0, None)
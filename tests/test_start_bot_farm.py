@@ -0,0 +1,42 @@
+import json
+import start_bot_farm
+
+
+SENSORS = [{'temperature': {'field': 'field1'}}]
+
+
+def write_config(tmp_path, **kwargs) -> str:
+    config = {'bots': [{'email': 'a@x', 'channel': '1', 'bot_name': 'bot_1', 'api_key': 'K', 'sensors': SENSORS}]}
+    config.update(kwargs)
+    file_name = tmp_path / 'farm.json'
+    file_name.write_text(json.dumps(config))
+    return str(file_name)
+
+
+def test_dry_run_writes_nothing(tmp_path, capsys, monkeypatch):
+    monkeypatch.setattr(start_bot_farm, 'setup_logging', lambda logging_config, seed: None)
+    file_name = write_config(tmp_path, checkpoint={'file_name': str(tmp_path / 'state.bin')},
+                             trajectory={'file_name': str(tmp_path / 'values.bftr')})
+    assert start_bot_farm.main([file_name, '--mode', 'dry-run', '--json']) == 0
+    assert json.loads(capsys.readouterr().out)['measurements'] == 1
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['farm.json']
+
+
+def test_seed_option_equals_config_seed(tmp_path, monkeypatch):
+    monkeypatch.setattr(start_bot_farm, 'setup_logging', lambda logging_config, seed: None)
+    readings = []
+    for num, (config_seed, options) in enumerate(((None, ['--seed', '7']), (7, []), (None, ['--seed', '8']))):
+        values_file = tmp_path / f'values_{num}.jsonl'
+        config = {'start_time': 1700000000} if config_seed is None else {'start_time': 1700000000, 'seed': config_seed}
+        file_name = write_config(tmp_path, **config)
+        start_bot_farm.main([file_name, '--mode', 'accelerated', '--iterations', '5', '--json',
+                             '--sink', json.dumps({'type': 'file', 'file_name': str(values_file)})] + options)
+        readings.append(values_file.read_text())
+    assert readings[0] == readings[1] != readings[2]
+
+
+def test_metrics_are_off_unless_asked():
+    args = start_bot_farm.parse_args([])
+    assert 'metrics' not in start_bot_farm.apply_args({}, args)
+    args = start_bot_farm.parse_args(['--metrics'])
+    assert start_bot_farm.apply_args({}, args)['metrics'] == {}
@@ -0,0 +1,44 @@
+import numpy as np
+from Sensors.sensors import TemperatureSensor
+from Sensors.streams import seek, skips, stream_key, uniform, uniforms
+from Sensors.vectorized import SensorArray
+
+
+KEY = stream_key(7, 'bot_1', 'field1')
+
+def seek_state(count: int) -> int:
+    sensor = TemperatureSensor({'field': 'field1'}, KEY)
+    for _ in range(count):
+        sensor.measure()
+    return sensor.stream
+
+
+def test_sensor_array_measures_like_sensor():
+    sensor = TemperatureSensor({'field': 'field1'}, KEY)
+    sensors = SensorArray('temperature')
+    sensors.add({'field': 'field1'}, KEY)
+    for _ in range(100):
+        sensor.measure()
+        assert sensors.measure(now=0)[0] == sensor.current_value
+
+
+def test_stream_numbers_are_found_by_counter():
+    assert skips(np.array([KEY], dtype=np.uint64), np.array([1000], dtype=np.uint64))[0] == seek_state(1000)
+    assert uniforms(np.array([KEY, KEY], dtype=np.uint64), np.array([0, 99], dtype=np.uint64)).tolist() == \
+        [uniform(KEY, 0), uniform(KEY, 99)]
+
+
+def test_seek_continues_the_series():
+    sensor = TemperatureSensor({'field': 'field1'}, KEY)
+    for _ in range(10):
+        sensor.measure()
+    values = []
+    for _ in range(5):
+        sensor.measure()
+        values.append(sensor.current_value)
+    restored = TemperatureSensor({'field': 'field1'}, KEY)
+    restored.current_value = values[0]
+    seek(restored, 11)
+    for value in values[1:]:
+        restored.measure()
+        assert restored.current_value == value